@@ -9,3 +9,4 @@ FACTORY_COMMANDS_FILE = os.path.join(FACTORY_DIR, 'commands.txt')
 FACTORY_SCRIPT_OUTPUT_DIR = os.path.join(FACTORY_DIR, 'script-output/')
 FACTORY_SCRIPT_OUTPUT_FILE = os.path.join(FACTORY_SCRIPT_OUTPUT_DIR, 'resposta.json')
 
+FACTORY_CHAT_LOG_FILE = os.path.join(FACTORY_SCRIPT_OUTPUT_DIR, 'monika_chat.log')
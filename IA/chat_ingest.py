@@ -0,0 +1,168 @@
+"""Fontes de mensagens do chat: poll adaptativo via RCON ou tail de arquivo com inotify."""
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import AsyncIterator, List, Optional
+
+# Constantes do inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class AdaptivePoller:
+    """Intervalo de poll que volta ao mínimo após atividade e dobra enquanto o chat está quieto."""
+
+    def __init__(self, min_interval: float = 0.05, max_interval: float = 2.0, factor: float = 2.0):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.factor = factor
+        self.interval = min_interval
+
+    def next_delay(self, active: bool) -> float:
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.factor)
+        return self.interval
+
+
+class RconPollSource:
+    """Consulta `command` (ex.: `/monika_pull`) no pool RCON com intervalo adaptativo."""
+
+    def __init__(self, pool, command: str = "/monika_pull", poller: Optional[AdaptivePoller] = None):
+        self.pool = pool
+        self.command = command
+        self.poller = poller or AdaptivePoller()
+
+    async def messages(self) -> AsyncIterator[str]:
+        while True:
+            active = False
+            try:
+                raw = await self.pool.command(self.command)
+            except Exception as exc:
+                # o pool repõe a conexão em segundo plano; só espera o próximo ciclo
+                print(f"[chat_ingest] ERROR polling {self.command}: {exc!r}")
+                raw = None
+            if raw and raw.strip():
+                active = True
+                yield raw
+            await asyncio.sleep(self.poller.next_delay(active))
+
+
+class Inotify:
+    """Watch mínimo de inotify (via ctypes) no diretório de um arquivo."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch falhou em {directory}")
+
+    def read_names(self) -> List[str]:
+        names: List[str] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\x00")))
+                offset += length
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileTailSource:
+    """Segue um arquivo de log (console do Factorio ou arquivo do mod em `script-output`).
+
+    No Linux acorda por inotify assim que o arquivo muda, então as mensagens
+    chegam em milissegundos e o processo fica parado quando o chat está quieto.
+    Sem inotify, cai para `stat` com intervalo adaptativo. Começa no fim do
+    arquivo (ignora histórico) e trata truncamento/rotação.
+    """
+
+    def __init__(self, path: str, poller: Optional[AdaptivePoller] = None, encoding: str = "utf-8"):
+        self.path = path
+        self.poller = poller or AdaptivePoller()
+        self.encoding = encoding
+        self._offset: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._partial = b""
+
+    def _read_new(self) -> List[str]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self._offset is None:
+            self._offset, self._inode = st.st_size, st.st_ino
+            return []
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # arquivo rotacionado ou truncado: recomeça do início
+            self._offset, self._inode, self._partial = 0, st.st_ino, b""
+        if st.st_size == self._offset:
+            return []
+        with open(self.path, "rb") as handler:
+            handler.seek(self._offset)
+            chunk = handler.read(st.st_size - self._offset)
+        self._offset += len(chunk)
+        data = self._partial + chunk
+        complete, _, self._partial = data.rpartition(b"\n")
+        if not complete:
+            return []
+        text = complete.decode(self.encoding, errors="ignore")
+        return [line for line in text.splitlines() if line.strip()]
+
+    async def messages(self) -> AsyncIterator[str]:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        basename = os.path.basename(self.path)
+        watch: Optional[Inotify] = None
+        try:
+            watch = Inotify(directory)
+        except (OSError, AttributeError) as exc:
+            print(f"[chat_ingest] inotify indisponível ({exc}); usando stat com intervalo adaptativo")
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        if watch is not None:
+            loop.add_reader(watch.fd, changed.set)
+        try:
+            if os.path.exists(self.path):
+                self._read_new()  # posiciona no fim do arquivo
+            else:
+                self._offset = 0  # arquivo criado depois: lê desde o início
+            while True:
+                lines = self._read_new()
+                for line in lines:
+                    yield line
+                if watch is None:
+                    await asyncio.sleep(self.poller.next_delay(bool(lines)))
+                    continue
+                # dorme até um evento do inotify envolvendo o arquivo seguido
+                while basename not in watch.read_names():
+                    await changed.wait()
+                    changed.clear()
+        finally:
+            if watch is not None:
+                loop.remove_reader(watch.fd)
+                watch.close()
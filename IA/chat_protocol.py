@@ -0,0 +1,111 @@
+"""Parser do lote de mensagens devolvido pelo `/monika_pull` (ou lido do log do chat)."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+# '2025-11-28 12:56:05 [CHAT] thiago: ola' | '[123456] thiago: ola' | 'thiago: ola'
+CHAT_LINE = re.compile(
+    r"^(?:\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}\s+)?"
+    r"(?:\[(?P<tag>[A-Z]+)\]\s*)?"
+    r"(?:\[(?P<tick>\d+)\]\s*)?"
+    r"(?P<player>[^\s:\[\]]+):\s(?P<text>.*)$"
+)
+
+
+# separadores aceitos logo depois do gatilho: "monika, ...", "monika: ...", "@monika ..."
+_TRIGGER_TAIL = re.compile(r"^[\s,:;.!?-]+")
+
+
+class ChatMessage(NamedTuple):
+    player: Optional[str]
+    text: str
+    tick: Optional[int] = None
+
+    @property
+    def prompt(self) -> str:
+        """Formato 'player: message' usado no histórico e enviado ao modelo."""
+        return f"{self.player}: {self.text}" if self.player else self.text
+
+
+def _from_json(entry) -> Optional[ChatMessage]:
+    if not isinstance(entry, dict):
+        return None
+    text = entry.get("message") or entry.get("text")
+    if not isinstance(text, str) or not text.strip():
+        return None
+    player = entry.get("player") or entry.get("name")
+    tick = entry.get("tick")
+    return ChatMessage(
+        str(player) if player else None,
+        text.strip(),
+        int(tick) if isinstance(tick, (int, float)) else None,
+    )
+
+
+def parse_chat_line(line: str) -> ChatMessage:
+    """Interpreta uma linha; sem o formato 'player: message' vira mensagem sem jogador."""
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            message = _from_json(json.loads(line))
+        except ValueError:
+            message = None
+        if message is not None:
+            return message
+    match = CHAT_LINE.match(line)
+    if not match or (match.group("tag") and match.group("tag") != "CHAT"):
+        return ChatMessage(None, line)
+    tick = match.group("tick")
+    return ChatMessage(match.group("player"), match.group("text").strip(), int(tick) if tick else None)
+
+
+def parse_chat_batch(raw: str) -> List[ChatMessage]:
+    """Separa todas as mensagens enfileiradas em uma única resposta do RCON.
+
+    Aceita um array JSON (`[{"player": .., "tick": .., "message": ..}, ...]`),
+    uma mensagem JSON por linha ou o formato texto de uma mensagem por linha,
+    na ordem em que chegaram; nenhuma mensagem do lote é descartada.
+    """
+    if not raw or not raw.strip():
+        return []
+    stripped = raw.strip()
+    if stripped.startswith("["):
+        try:
+            payload = json.loads(stripped)
+        except ValueError:
+            payload = None
+        if isinstance(payload, list):
+            return [message for message in map(_from_json, payload) if message is not None]
+    return [parse_chat_line(line) for line in stripped.splitlines() if line.strip()]
+
+
+def parse_triggers(spec: str) -> Tuple[str, ...]:
+    """`"monika, !m"` -> ("monika", "!m"); vazio = nenhum filtro."""
+    return tuple(item.strip().lower() for item in spec.split(",") if item.strip())
+
+
+def strip_trigger(message: ChatMessage, triggers: Sequence[str]) -> Optional[ChatMessage]:
+    """A mensagem sem o gatilho do começo ("monika, qual a pilha..." -> "qual a pilha...").
+
+    None quando o texto não começa por nenhum gatilho (conversa comum entre
+    jogadores, que não deve ocupar geração) ou só tem o gatilho. Sem
+    gatilhos, devolve a mensagem como está.
+    """
+    if not triggers:
+        return message
+    text = message.text.lstrip()
+    lowered = text.lower().lstrip("@")
+    offset = len(text) - len(lowered)
+    for trigger in triggers:
+        if not lowered.startswith(trigger):
+            continue
+        rest = text[offset + len(trigger):]
+        if rest and rest[0].isalnum() and trigger[-1:].isalnum():
+            # "monikas" não é "monika"
+            continue
+        rest = _TRIGGER_TAIL.sub("", rest)
+        return message._replace(text=rest) if rest else None
+    return None
@@ -0,0 +1,174 @@
+"""Monta as mensagens do `ollama.chat` dentro de um orçamento de tokens."""
+
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from IA.item_context import format_prompt_with_context
+
+# Custo aproximado do envelope de cada mensagem (role, separadores do template)
+MESSAGE_OVERHEAD = 4
+CHARS_PER_TOKEN = 4.0
+_WORD = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+DIGEST_HEADER = "### RESUMO DAS CONVERSAS ANTERIORES"
+RELATED_HEADER = "### CONVERSAS ANTERIORES RELACIONADAS"
+
+
+def format_related(entry: Dict[str, object]) -> str:
+    lines = []
+    if entry.get("prompt"):
+        lines.append(f"Jogador: {entry['prompt']}")
+    if entry.get("response"):
+        lines.append(f"Monika: {entry['response']}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Estimativa rápida de tokens (sem tokenizer): o maior entre chars/4 e palavras+pontuação.
+
+    Em cache, pois os mesmos turnos do histórico são medidos a cada prompt.
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / CHARS_PER_TOKEN), len(_WORD.findall(text)))
+
+
+def _message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD
+
+
+class ContextResult(NamedTuple):
+    messages: List[Dict[str, str]]
+    budget: int
+    used_tokens: int
+    dropped_tokens: int
+    dropped_turns: int
+    item_context_dropped: bool
+    dropped_digests: int = 0
+    related_turns: int = 0
+    dropped_related: int = 0
+
+    def summary(self) -> str:
+        text = f"{self.used_tokens}/{self.budget} tokens"
+        if self.related_turns:
+            text += f", {self.related_turns} related turns"
+        if self.dropped_tokens:
+            what = f"{self.dropped_turns} turns"
+            if self.dropped_digests:
+                what += f" + {self.dropped_digests} digests"
+            if self.dropped_related:
+                what += f" + {self.dropped_related} related"
+            if self.item_context_dropped:
+                what += " + item context"
+            text += f", dropped {self.dropped_tokens} tokens ({what})"
+        return text
+
+
+def build_context(
+    system_prompt: str,
+    prompt: str,
+    history: Sequence[Dict[str, object]] = (),
+    item_context: Optional[str] = None,
+    budget: int = 4096,
+    digests: Sequence[str] = (),
+    related: Sequence[Dict[str, object]] = (),
+) -> ContextResult:
+    """Preenche `budget` tokens por prioridade: SYSTEM, itens, resumos, turnos relacionados, recentes.
+
+    O SYSTEM e a mensagem atual entram sempre; o contexto de itens entra se
+    couber, depois os resumos do histórico antigo (mais novos primeiro), os
+    turnos antigos relacionados à pergunta (`related`, em ordem de relevância)
+    e os turnos do histórico do mais recente para o mais antigo até o
+    orçamento acabar. O que ficou de fora é contabilizado no resultado.
+    """
+    used = _message_tokens(system_prompt) + _message_tokens(prompt)
+    dropped = 0
+
+    user_content = prompt
+    item_context_dropped = False
+    if item_context:
+        with_context = format_prompt_with_context(item_context, prompt)
+        extra = estimate_tokens(with_context) - estimate_tokens(prompt)
+        if used + extra <= budget:
+            user_content = with_context
+            used += extra
+        else:
+            item_context_dropped = True
+            dropped += extra
+
+    kept_digests: List[str] = []
+    dropped_digests = 0
+    for index in range(len(digests) - 1, -1, -1):
+        line = f"- {digests[index]}"
+        cost = estimate_tokens(line) + (0 if kept_digests else _message_tokens(DIGEST_HEADER))
+        if used + cost > budget:
+            dropped_digests = index + 1
+            dropped += sum(estimate_tokens(f"- {older}") for older in digests[: index + 1])
+            break
+        used += cost
+        kept_digests.append(line)
+
+    kept_related: List[Dict[str, object]] = []
+    dropped_related = 0
+    for entry in related:
+        line = format_related(entry)
+        cost = estimate_tokens(line) + (0 if kept_related else _message_tokens(RELATED_HEADER))
+        if used + cost > budget:
+            dropped_related += 1
+            dropped += estimate_tokens(line)
+            continue
+        used += cost
+        kept_related.append(entry)
+    # um turno que já entrou como relacionado não se repete no histórico recente
+    related_ids = {entry["id"] for entry in kept_related if entry.get("id") is not None}
+
+    turns: List[List[Dict[str, str]]] = []
+    dropped_turns = 0
+    for index in range(len(history) - 1, -1, -1):
+        entry = history[index]
+        if entry.get("id") in related_ids:
+            continue
+        turn = []
+        if entry.get("prompt"):
+            turn.append({"role": "user", "content": str(entry["prompt"])})
+        if entry.get("response"):
+            turn.append({"role": "assistant", "content": str(entry["response"])})
+        cost = sum(_message_tokens(message["content"]) for message in turn)
+        if used + cost > budget:
+            # orçamento esgotado: o restante (mais antigo) fica de fora
+            for older in history[: index + 1]:
+                dropped += sum(
+                    _message_tokens(str(older[key])) for key in ("prompt", "response") if older.get(key)
+                )
+            dropped_turns = index + 1
+            break
+        used += cost
+        turns.append(turn)
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if kept_digests:
+        body = "\n".join(reversed(kept_digests))
+        messages.append({"role": "system", "content": f"{DIGEST_HEADER}\n{body}"})
+    if kept_related:
+        # em ordem cronológica, como o resto da conversa
+        kept_related.sort(key=lambda entry: entry.get("id") or 0)
+        body = "\n\n".join(format_related(entry) for entry in kept_related)
+        messages.append({"role": "system", "content": f"{RELATED_HEADER}\n{body}"})
+    for turn in reversed(turns):
+        messages.extend(turn)
+    messages.append({"role": "user", "content": user_content})
+    return ContextResult(
+        messages,
+        budget,
+        used,
+        dropped,
+        dropped_turns,
+        item_context_dropped,
+        dropped_digests,
+        len(kept_related),
+        dropped_related,
+    )
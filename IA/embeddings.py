@@ -0,0 +1,58 @@
+"""Embeddings de texto: endpoint de embed do Ollama ou um stand-in local por hashing."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from typing import List, Sequence
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_vector(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        return [0.0 for _ in vector]
+    return [value / norm for value in vector]
+
+
+def dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class HashingEmbedder:
+    """Embedding local e determinístico (feature hashing de palavras e bigramas).
+
+    Não entende sinônimos como um modelo de embedding, mas pega reformulações
+    com as mesmas palavras; serve quando o Ollama não tem modelo de embed e
+    como substituto em testes.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        words = _TOKEN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return normalize_vector(vector)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+class OllamaEmbedder:
+    """Usa o endpoint de embed do Ollama (`AsyncClient.embed`) e normaliza os vetores."""
+
+    def __init__(self, client, model: str = "nomic-embed-text"):
+        self.client = client
+        self.model = model
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        result = await self.client.embed(model=self.model, input=list(texts))
+        return [normalize_vector(vector) for vector in result["embeddings"]]
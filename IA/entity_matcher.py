@@ -0,0 +1,145 @@
+"""Reconhecimento de várias frases num texto com uma única passada (Aho-Corasick).
+
+As frases (nomes de itens, apelidos, palavras-chave) ficam numa trie com
+links de falha; achar todas as ocorrências custa O(tamanho do texto +
+ocorrências), independente de quantas frases existem. Frases novas entram
+na trie na hora (`add`); os links de falha são refeitos uma vez, na próxima
+busca, então acrescentar itens aos poucos não reconstrói nada à toa.
+
+Texto e frases passam pela mesma normalização: minúsculas, sem acentos e
+com tudo que não é letra/dígito virando espaço ("Baú de Aço", "bau-de-aco"
+e "bau_de_aco" são iguais).
+"""
+
+from __future__ import annotations
+
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, Hashable, List, NamedTuple, Set, Tuple
+
+MIN_PHRASE_CHARS = 3
+
+
+def normalize_text(text: str) -> str:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    chars = [char if char.isalnum() else " " for char in folded if not unicodedata.combining(char)]
+    return " ".join("".join(chars).split())
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    value: Hashable
+
+
+class EntityMatcher:
+    """Frases -> valores; `find` devolve as ocorrências mais longas, da esquerda para a direita.
+
+    Uma frase casa só em palavras inteiras (aceitando um "s" de plural no
+    fim); com `prefix=True` basta o começo da palavra ("bicho" em "bichos").
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # próximo nó na cadeia de falha que termina alguma frase (-1 = nenhum)
+        self._report: List[int] = [-1]
+        self._depth: List[int] = [0]
+        self._values: List[Set[Tuple[Hashable, bool]]] = [set()]
+        self._nodes_of: Dict[Hashable, Set[int]] = {}
+        self._linked = True
+
+    def __len__(self) -> int:
+        return len(self._nodes_of)
+
+    def add(self, phrase: str, value: Hashable, prefix: bool = False) -> bool:
+        key = normalize_text(phrase)
+        if len(key) < MIN_PHRASE_CHARS:
+            return False
+        with self._lock:
+            node = 0
+            for char in key:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._report.append(-1)
+                    self._depth.append(self._depth[node] + 1)
+                    self._values.append(set())
+                    self._goto[node][char] = child
+                    self._linked = False
+                node = child
+            if (value, prefix) not in self._values[node]:
+                self._values[node].add((value, prefix))
+                self._nodes_of.setdefault(value, set()).add(node)
+                self._linked = False
+        return True
+
+    def discard(self, value: Hashable) -> None:
+        """Esquece todas as frases de `value` (os nós ficam na trie, só sem saída)."""
+        with self._lock:
+            nodes = self._nodes_of.pop(value, ())
+            for node in nodes:
+                self._values[node] = {entry for entry in self._values[node] if entry[0] != value}
+            if nodes:
+                self._linked = False
+
+    def _link(self) -> None:
+        """Refaz os links de falha (BFS na trie inteira)."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._report[child] = -1
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target
+                self._report[child] = target if self._values[target] else self._report[target]
+                queue.append(child)
+        self._linked = True
+
+    def find(self, text: str) -> List[Match]:
+        key = normalize_text(text)
+        size = len(key)
+        candidates: List[Match] = []
+        with self._lock:
+            if not self._linked:
+                self._link()
+            goto, fail, report, depth, values = self._goto, self._fail, self._report, self._depth, self._values
+            node = 0
+            for position, char in enumerate(key):
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+                out = node if values[node] else report[node]
+                while out > 0:
+                    start = position - depth[out] + 1
+                    if start == 0 or key[start - 1] == " ":
+                        end = position + 1
+                        whole = end == size or key[end] == " "
+                        plural = not whole and key[end] == "s" and (end + 1 == size or key[end + 1] == " ")
+                        for value, prefix in values[out]:
+                            if prefix or whole or plural:
+                                candidates.append(Match(start, end, value))
+                    out = report[out]
+
+        # sem sobreposição: a mais à esquerda e, no mesmo início, a mais longa
+        candidates.sort(key=lambda match: (match.start, match.start - match.end))
+        chosen: List[Match] = []
+        last_end = -1
+        for match in candidates:
+            if match.start >= last_end:
+                chosen.append(match)
+                last_end = match.end
+            elif chosen and match.start == chosen[-1].start and match.end == chosen[-1].end:
+                # mesma frase com outro valor (apelido compartilhado, palavra-chave que é item)
+                chosen.append(match)
+        return chosen
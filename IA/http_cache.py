@@ -0,0 +1,168 @@
+"""Cache HTTP em disco para as páginas da wiki, com GET condicional.
+
+Cada página fica comprimida (gzip) em `directory`, junto com o ETag e o
+Last-Modified devolvidos pelo servidor. Dentro do `ttl` a página sai do
+disco sem rede; depois disso é revalidada com `If-None-Match` /
+`If-Modified-Since`, e um 304 custa só o round trip. Se a revalidação falhar
+por rede, a cópia antiga é usada.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def make_session(pool_size: int = 8, user_agent: Optional[str] = None) -> requests.Session:
+    """Session com pool de conexões (keep-alive reaproveitado entre requisições e threads)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    return session
+
+
+class CachedPage:
+    __slots__ = ("url", "body", "encoding", "etag", "last_modified", "validated_at")
+
+    def __init__(self, url, body, encoding, etag, last_modified, validated_at):
+        self.url = url
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.validated_at = validated_at
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+
+class PageCache:
+    """Páginas por URL em `directory/<sha1>.html.gz` + `<sha1>.json` (metadados)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".html.gz", base + ".json"
+
+    def load(self, url: str) -> Optional[CachedPage]:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as handler:
+                meta = json.load(handler)
+            with gzip.open(body_path, "rb") as handler:
+                body = handler.read()
+        except (OSError, ValueError, EOFError):
+            return None
+        return CachedPage(
+            url, body, meta.get("encoding"), meta.get("etag"), meta.get("last_modified"), meta.get("validated_at", 0)
+        )
+
+    def _write_meta(self, page: CachedPage, meta_path: str) -> None:
+        tmp = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handler:
+            json.dump(
+                {
+                    "url": page.url,
+                    "encoding": page.encoding,
+                    "etag": page.etag,
+                    "last_modified": page.last_modified,
+                    "validated_at": page.validated_at,
+                },
+                handler,
+            )
+        os.replace(tmp, meta_path)
+
+    def save(self, page: CachedPage) -> None:
+        body_path, meta_path = self._paths(page.url)
+        tmp = f"{body_path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as handler:
+            handler.write(page.body)
+        os.replace(tmp, body_path)
+        # metadados por último: uma página só é válida com o corpo já no lugar
+        self._write_meta(page, meta_path)
+
+    def touch(self, page: CachedPage) -> None:
+        """Registra uma revalidação (304) sem regravar o corpo."""
+        self._write_meta(page, self._paths(page.url)[1])
+
+
+class CachedFetcher:
+    """GET com cache em disco: fresco dentro do `ttl`, depois revalidado condicionalmente."""
+
+    def __init__(self, cache: PageCache, session: Optional[requests.Session] = None, ttl: float = 7 * 86400):
+        self.cache = cache
+        self.session = session or make_session()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"fresh": 0, "not_modified": 0, "downloaded": 0, "stale": 0, "bytes": 0}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def get(
+        self,
+        url: str,
+        timeout: float = 30.0,
+        headers: Optional[Dict[str, str]] = None,
+        max_age: Optional[float] = None,
+        session: Optional[requests.Session] = None,
+    ) -> str:
+        """Texto da página; `max_age` sobrescreve o `ttl` (0 = sempre revalida)."""
+        max_age = self.ttl if max_age is None else max_age
+        cached = self.cache.load(url)
+        now = time.time()
+        if cached is not None and now - cached.validated_at < max_age:
+            self._count("fresh")
+            return cached.text
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request_headers["If-Modified-Since"] = cached.last_modified
+        try:
+            response = (session or self.session).get(url, timeout=timeout, headers=request_headers)
+        except requests.RequestException as exc:
+            if cached is None:
+                raise
+            self._count("stale")
+            print(f"[http_cache] revalidation failed for {url}, serving cached copy: {exc!r}")
+            return cached.text
+
+        if response.status_code == 304 and cached is not None:
+            cached.validated_at = now
+            self.cache.touch(cached)
+            self._count("not_modified")
+            return cached.text
+        response.raise_for_status()
+
+        page = CachedPage(
+            url,
+            response.content,
+            response.encoding,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            now,
+        )
+        self.cache.save(page)
+        self._count("downloaded")
+        self._count("bytes", len(response.content))
+        return page.text
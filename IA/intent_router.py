@@ -0,0 +1,232 @@
+"""Respostas diretas (sem modelo) para perguntas que são só consulta à base de itens.
+
+"Qual a pilha do [item=steel-chest]?", "how long to craft [item=...]",
+"quantas montadoras pra 2 [item=...] por minuto?": a resposta já está na
+base de itens ou no grafo de receitas, então sai de um template em
+microssegundos em vez de segundos de inferência. O roteador só responde
+quando reconhece todas as intenções da pergunta e tem todos os dados; o
+resto (perguntas abertas, "por que", "qual o melhor", item ainda fora da
+base) segue para o modelo. `stats()` expõe quantas perguntas foram
+respondidas direto e por qual intenção.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from IA.item_context import ITEM_TAG, extract_item_slugs, get_item_store, get_recipe_graph
+from IA.recipe_graph import RecipeGraph, parse_rate, recipe_from_payload, to_slug
+
+# perguntas maiores que isso quase nunca são só uma consulta
+MAX_QUESTION_CHARS = 160
+MAX_ITEMS = 3
+
+# ordem = ordem das frases na resposta; os padrões rodam sobre o texto sem acentos e sem tags
+_INTENTS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = tuple(
+    (name, re.compile(pattern))
+    for name, pattern in (
+        (
+            "machines",
+            r"\b(quant[oa]s (maquinas|montadoras|fornalhas|fabricas)|how many (machines|assemblers|furnaces))\b",
+        ),
+        (
+            "raw_cost",
+            r"\b(custo bruto|materias?[ -]?primas?|materiais brutos|raw (cost|materials?|resources?)|total raw)\b",
+        ),
+        (
+            "recipe",
+            # "faço"/"faça" chegam aqui como "faco"/"faca"
+            r"\b(receita|ingredientes?|como (eu |se )?(faz\w*|fac[oa]|fabric\w*|craft\w*|produz\w*)|recipe|ingredients?"
+            r"|how (do i|to|can i) (make|craft))\b",
+        ),
+        (
+            "recipe_time",
+            r"\b(tempo de (fabricacao|producao|craft\w*|receita)|quanto tempo|demora|crafting time|recipe time"
+            r"|craft time|how long)\b",
+        ),
+        ("stack_size", r"\b(pilha|empilha\w*|stack( size)?|stacks)\b"),
+        ("inventory_size", r"\b(slots?|espacos?|capacidade|inventario|inventory( size)?|storage size)\b"),
+        ("health", r"\b(vida|hp|health|hit points)\b"),
+        ("tech", r"\b(tecnologias?|pesquisas?|research|technolog\w*|desbloque\w*|unlock\w*)\b"),
+    )
+)
+# sinais de pergunta aberta: vai para o modelo mesmo que uma intenção case
+_OPEN_ENDED = re.compile(
+    r"\b(por ?que|pq|porque|why|melhor|best|dicas?|tips?|expli\w*|compar\w*|vale a pena|worth|devo|should"
+    r"|estrategia|strategy|layout|design|ajud\w*|help|ideia|idea)\b|\bvs\b"
+)
+_PARENS = re.compile(r"\s*\(.*?\)")
+_ENGLISH = re.compile(r"\b(how|what|which|the|does|is|many|much|to craft|for)\b")
+
+
+class FastAnswer(NamedTuple):
+    text: str
+    intents: Tuple[str, ...]
+
+
+def _fold(text: str) -> str:
+    """Minúsculas, sem tags de item e sem acentos ("matéria" == "materia")."""
+    text = ITEM_TAG.sub(" ", text.lower())
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def _num(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3g}" if value < 1000 else f"{value:,.0f}"
+    return str(value)
+
+
+def _items(amounts: Dict[str, float]) -> str:
+    return ", ".join(f"{_num(amount)} [item={name}]" for name, amount in sorted(amounts.items()))
+
+
+class IntentRouter:
+    """Roteia uma pergunta para um template (`route` devolve a resposta) ou para o modelo (None)."""
+
+    def __init__(
+        self,
+        lookup: Optional[Callable[[str], Optional[dict]]] = None,
+        graph: Optional[Callable[[], RecipeGraph]] = None,
+    ):
+        self.lookup = lookup or (lambda slug: get_item_store().get(slug))
+        self.graph = graph or get_recipe_graph
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.to_model = 0
+        self.by_intent: Dict[str, int] = {}
+        self._routed_seconds = 0.0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.routed + self.to_model
+            return {
+                "fast": self.routed,
+                "model": self.to_model,
+                "hit_rate": round(self.routed / total, 3) if total else 0.0,
+                "avg_fast_us": round(self._routed_seconds / self.routed * 1e6, 1) if self.routed else 0.0,
+                "intents": dict(self.by_intent),
+            }
+
+    def classify(self, text: str) -> Tuple[List[str], bool]:
+        """Intenções de consulta reconhecidas e se a pergunta está em inglês."""
+        folded = _fold(text)
+        if len(folded) > MAX_QUESTION_CHARS or _OPEN_ENDED.search(folded):
+            return [], False
+        intents = [name for name, pattern in _INTENTS if pattern.search(folded)]
+        if "machines" in intents and parse_rate(text) is None:
+            intents.remove("machines")
+        if "recipe" in intents and "recipe_time" in intents:
+            # a frase da receita já traz o tempo
+            intents.remove("recipe_time")
+        return intents, bool(_ENGLISH.search(folded))
+
+    def route(self, text: str) -> Optional[FastAnswer]:
+        started = time.perf_counter()
+        answer = None
+        try:
+            answer = self._answer(text)
+        except Exception as exc:
+            print(f"[intent_router] ERROR answering {text!r}: {exc!r}")
+        with self._lock:
+            if answer is None:
+                self.to_model += 1
+            else:
+                self.routed += 1
+                self._routed_seconds += time.perf_counter() - started
+                for intent in answer.intents:
+                    self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+        return answer
+
+    def _answer(self, text: str) -> Optional[FastAnswer]:
+        slugs = extract_item_slugs(text)
+        if not slugs or len(slugs) > MAX_ITEMS:
+            return None
+        intents, english = self.classify(text)
+        if not intents:
+            return None
+        sentences = []
+        for slug in slugs:
+            payload = self.lookup(slug)
+            if not payload:
+                return None
+            for intent in intents:
+                sentence = getattr(self, f"_{intent}")(slug, payload, text, english)
+                if sentence is None:
+                    # falta o dado de uma das partes: o modelo responde tudo (com o contexto)
+                    return None
+                sentences.append(sentence)
+        return FastAnswer(" ".join(sentences), tuple(intents))
+
+    def _stack_size(self, slug, payload, text, english):
+        value = payload.get("stack_size")
+        if value is None:
+            return None
+        return f"[item={slug}] stacks to {value}." if english else f"[item={slug}] empilha até {value} por slot."
+
+    def _health(self, slug, payload, text, english):
+        value = payload.get("health")
+        if value is None:
+            return None
+        return f"[item={slug}] has {value} health." if english else f"[item={slug}] tem {value} de vida."
+
+    def _inventory_size(self, slug, payload, text, english):
+        value = payload.get("inventory_size")
+        if value is None:
+            return None
+        return f"[item={slug}] has {value} slots." if english else f"[item={slug}] tem {value} slots."
+
+    def _tech(self, slug, payload, text, english):
+        techs = payload.get("tech_required")
+        if not techs:
+            return None
+        # "Steel processing (research)" -> [technology=steel-processing]
+        names = ", ".join(f"[technology={to_slug(_PARENS.sub('', tech))}]" for tech in techs)
+        return f"[item={slug}] is unlocked by {names}." if english else f"[item={slug}] é desbloqueado por {names}."
+
+    def _recipe_time(self, slug, payload, text, english):
+        recipe = recipe_from_payload(slug, payload)
+        if recipe is None:
+            return None
+        if english:
+            return f"[item={slug}] takes {_num(recipe.time)}s to craft (crafting speed 1)."
+        return f"Fabricar [item={slug}] leva {_num(recipe.time)}s (velocidade de fabricação 1)."
+
+    def _recipe(self, slug, payload, text, english):
+        recipe = recipe_from_payload(slug, payload)
+        if recipe is None:
+            return None
+        made = f" → {_num(recipe.amount)}" if recipe.amount != 1 else ""
+        if english:
+            return f"Recipe for [item={slug}]: {_items(recipe.ingredients)}{made} in {_num(recipe.time)}s."
+        return f"Receita de [item={slug}]: {_items(recipe.ingredients)}{made} em {_num(recipe.time)}s."
+
+    def _raw_cost(self, slug, payload, text, english):
+        graph = self.graph()
+        if slug not in graph:
+            return None
+        raw = _items(graph.raw_cost(slug))
+        return f"Raw cost of one [item={slug}]: {raw}." if english else f"Custo bruto de um [item={slug}]: {raw}."
+
+    def _machines(self, slug, payload, text, english):
+        graph = self.graph()
+        rate = parse_rate(text)
+        if slug not in graph or not rate:
+            return None
+        needs = graph.requirements(slug, rate)
+        steps = []
+        chain = sorted((name for name in needs if name in graph), key=lambda name: (name != slug, -needs[name]))
+        for name in chain:
+            machines = graph.machines(name, needs[name])
+            if not machines:
+                continue
+            counts = " / ".join(f"{math.ceil(count - 1e-9)} [entity={machine}]" for machine, count in machines.items())
+            steps.append(f"[item={name}] {_num(needs[name])}/s: {counts}")
+        if not steps:
+            return None
+        head = f"For {_num(rate)}/s of [item={slug}]" if english else f"Para {_num(rate)}/s de [item={slug}]"
+        return f"{head}: " + "; ".join(steps) + "."
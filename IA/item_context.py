@@ -2,18 +2,77 @@
 
 from __future__ import annotations
 
-import copy
 import json
 import os
 import re
+import threading
 from functools import lru_cache
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from IA.entity_matcher import EntityMatcher
+from IA.item_enricher import ItemEnricher
+from IA.item_store import ItemStore, open_item_store
+from IA.recipe_graph import RecipeGraph, parse_rate
 
 ITEM_TAG = re.compile(r"\[item=([^\]\s]+)\]", re.IGNORECASE)
+# semente somente leitura: itens que faltarem no banco são importados dele
 ITEM_DATA_PATH = os.getenv(
     "FACTORIO_ITEM_DATA",
     os.path.join(os.path.dirname(__file__), "item_data.json"),
 )
+ITEM_DB_PATH = os.getenv(
+    "FACTORIO_ITEM_DB",
+    os.path.join(os.path.dirname(__file__), "ITEMS", "items.db"),
+)
+# apelidos em português dos itens ({"slug": ["baú de aço", ...]}), reconhecidos sem [item=...]
+ITEM_ALIASES_PATH = os.getenv(
+    "FACTORIO_ITEM_ALIASES",
+    os.path.join(os.path.dirname(__file__), "item_aliases.json"),
+)
+# itens citados sem tag que entram no contexto (as tags [item=...] entram todas)
+MAX_MENTIONS = 5
+# palavras que marcam uma conversa como sendo sobre o jogo (casam no começo da palavra)
+FACTORIO_KEYWORDS = (
+    "minério", "ferro", "cobre", "bicho", "bichos", "assembler", "foguete",
+    "rocket", "trem", "train", "ciência", "science", "engenheiro", "fábrica",
+    "factory", "poluição", "mod", "caldeira", "braço", "inserter", "belts",
+)
+# "background": item desconhecido vai para a fila de busca e o prompt segue sem ele;
+# "inline": baixa a página da wiki na hora (a resposta espera o download)
+ITEM_FETCH_MODE = os.getenv("FACTORIO_ITEM_FETCH", "background").lower()
+ITEM_FETCH_WORKERS = int(os.getenv("FACTORIO_ITEM_FETCH_WORKERS", "2"))
+# mude ao alterar render_item_fragment: os fragmentos gravados são refeitos na leitura
+FRAGMENT_VERSION = 1
+CONTEXT_HEADER = "### CONTEXTO AUTOMATICO (gerado pelo parser)"
+RECIPE_HEADER = "### CÁLCULOS DE PRODUÇÃO (exatos, use estes números)"
+
+# campos do payload que não ajudam a responder (só custam tokens)
+_SKIPPED_FIELDS = {"slug", "name", "wiki_url", "source", "retrieved_at", "raw_fields"}
+# números curtos que vão juntos na primeira linha
+_STAT_FIELDS = (("prototype_type", ""), ("stack_size", "pilha "), ("inventory_size", "slots "), ("health", "vida "))
+_FIELD_LABELS = {
+    "recipe": "receita",
+    "recipe_text": "receita",
+    "produced_by": "feito em",
+    "consumed_by": "usado em",
+    "used_by": "usado por",
+    "tech_required": "tecnologias",
+    "resistances": "resistências",
+}
+# campos crus da infobox que já aparecem promovidos (rótulo cru -> campo do payload)
+_RAW_PROMOTED = {
+    "Prototype type": "prototype_type",
+    "Internal name": "internal_name",
+    "Stack size": "stack_size",
+    "Storage size": "inventory_size",
+    "Health": "health",
+    "Resistances": "resistances",
+    "Recipe": "recipe_text",
+    "Produced by": "produced_by",
+    "Consumed by": "consumed_by",
+    "Required technologies": "tech_required",
+}
+_RAW_SKIPPED = {"Map color"}
 
 
 def _normalize_slug(raw: str) -> str:
@@ -26,30 +85,159 @@ def _display_name(slug: str) -> str:
     return " ".join(tokens) if tokens else slug
 
 
+# o primeiro uso pode vir de várias threads ao mesmo tempo (run_blocking, enricher)
+_SHARED_LOCK = threading.Lock()
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return f"{value:g}"
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_format_value(part) for part in value)
+    if isinstance(value, dict):
+        if "ingredients" in value:
+            return _format_recipe(value)
+        return "; ".join(f"{key} {_format_value(part)}" for key, part in value.items())
+    # valores crus da wiki trazem tabs/quebras de linha das tabelas aninhadas
+    return " ".join(str(value).split())
+
+
+def _format_recipe(recipe: dict) -> str:
+    parts = [f"{_format_value(amount)} {name}" for name, amount in (recipe.get("ingredients") or {}).items()]
+    text = " + ".join(parts)
+    if recipe.get("time") is not None:
+        text = f"{_format_value(recipe['time'])}s: {text}"
+    extra = {key: part for key, part in recipe.items() if key not in ("time", "ingredients")}
+    if extra:
+        text = f"{text}; {_format_value(extra)}"
+    return text
+
+
+def render_item_fragment(slug: str, payload: dict) -> str:
+    """Texto compacto do item para o prompt (uma linha de números e uma por campo).
+
+    Fica gravado junto com o item na base (ver `ItemStore.fragment`), então
+    montar o contexto de um prompt é só buscar e juntar strings.
+    """
+    name = payload.get("name") or _display_name(slug)
+    stats = [
+        f"{prefix}{_format_value(payload[key])}" for key, prefix in _STAT_FIELDS if payload.get(key) not in (None, "")
+    ]
+    head = f"{name} ({slug})"
+    lines = [f"{head}: {'; '.join(stats)}" if stats else head]
+
+    shown = {key for key, _ in _STAT_FIELDS}
+    if payload.get("internal_name") == slug:
+        shown.add("internal_name")
+    for key, value in payload.items():
+        if key in _SKIPPED_FIELDS or key in shown or value in (None, "", [], {}):
+            continue
+        label = _FIELD_LABELS.get(key, key.replace("_", " "))
+        lines.append(f"{label}: {_format_value(value)}")
+
+    raw_fields = payload.get("raw_fields") or {}
+    for label, value in raw_fields.items():
+        if label in _RAW_SKIPPED or payload.get(_RAW_PROMOTED.get(label, "")) not in (None, "", []):
+            continue
+        text = _format_value(value)
+        if text:
+            lines.append(f"{label}: {text}")
+    return "\n".join(lines)
+
+
 @lru_cache(maxsize=1)
-def _load_item_data() -> Dict[str, dict]:
+def _shared_item_store() -> ItemStore:
+    return open_item_store(
+        ITEM_DB_PATH, ITEM_DATA_PATH, renderer=render_item_fragment, renderer_version=FRAGMENT_VERSION
+    )
+
+
+def get_item_store() -> ItemStore:
+    """Base de itens compartilhada, aberta (e semeada pelo JSON) no primeiro uso."""
+    with _SHARED_LOCK:
+        return _shared_item_store()
+
+
+@lru_cache(maxsize=1)
+def _shared_item_enricher() -> ItemEnricher:
+    return ItemEnricher(_auto_add_item, workers=ITEM_FETCH_WORKERS)
+
+
+def get_item_enricher() -> ItemEnricher:
+    with _SHARED_LOCK:
+        return _shared_item_enricher()
+
+
+def load_item_aliases(path: str) -> Dict[str, List[str]]:
     try:
-        with open(ITEM_DATA_PATH, "r", encoding="utf-8") as handler:
-            payload = json.load(handler)
-            return payload if isinstance(payload, dict) else {}
+        with open(path, "r", encoding="utf-8") as handler:
+            data = json.load(handler)
     except FileNotFoundError:
         return {}
     except Exception as exc:
-        print(f"[item_context] ERROR loading {ITEM_DATA_PATH}: {exc}")
+        print(f"[item_context] ERROR reading aliases {path}: {exc}")
         return {}
+    return {slug: [alias for alias in aliases if isinstance(alias, str)] for slug, aliases in data.items()}
+
+
+def _plural_pt(alias: str) -> str:
+    """Plural da primeira palavra ("placa de ferro" -> "placas de ferro", "engrenagem" -> "engrenagens")."""
+    head, _, rest = alias.partition(" ")
+    if head.endswith("ão"):
+        head = head[:-2] + "ões"
+    elif head.endswith("m"):
+        head = head[:-1] + "ns"
+    elif head.endswith("l"):
+        head = head[:-1] + "is"
+    elif head.endswith(("r", "z")):
+        head += "es"
+    elif not head.endswith("s"):
+        head += "s"
+    return f"{head} {rest}" if rest else head
+
+
+def _item_phrases(slug: str, payload: Optional[dict], aliases: Iterable[str] = ()) -> List[str]:
+    phrases = [slug]
+    for alias in aliases:
+        phrases.extend((alias, _plural_pt(alias)))
+    if payload:
+        phrases.extend(payload.get(key) for key in ("name", "internal_name") if isinstance(payload.get(key), str))
+        phrases.extend(alias for alias in payload.get("aliases") or () if isinstance(alias, str))
+    return phrases
+
+
+@lru_cache(maxsize=1)
+def _shared_entity_matcher() -> EntityMatcher:
+    matcher = EntityMatcher()
+    for keyword in FACTORIO_KEYWORDS:
+        matcher.add(keyword, ("keyword", keyword), prefix=True)
+    aliases = load_item_aliases(ITEM_ALIASES_PATH)
+    for slug, names in aliases.items():
+        for phrase in _item_phrases(slug, None, names):
+            matcher.add(phrase, slug)
+
+    def on_change(slug: str, payload: Optional[dict]) -> None:
+        if payload is None:
+            if slug not in aliases:
+                matcher.discard(slug)
+            return
+        # só frases novas mexem na trie; regravar um item igual não custa nada
+        for phrase in _item_phrases(slug, payload):
+            matcher.add(phrase, slug)
 
+    store = _shared_item_store()
+    # registra antes de ler a base: um item gravado no meio da leitura não se perde
+    store.add_listener(on_change)
+    for slug, payload in store.items():
+        for phrase in _item_phrases(slug, payload):
+            matcher.add(phrase, slug)
+    return matcher
 
-def _save_item_data(data: Dict[str, dict]) -> None:
-    directory = os.path.dirname(ITEM_DATA_PATH)
-    if directory:
-        os.makedirs(directory, exist_ok=True)
-    tmp_path = ITEM_DATA_PATH + ".tmp"
-    with open(tmp_path, "w", encoding="utf-8") as handler:
-        json.dump(data, handler, ensure_ascii=False, indent=2)
-        handler.flush()
-        if hasattr(os, "fsync"):
-            os.fsync(handler.fileno())
-    os.replace(tmp_path, ITEM_DATA_PATH)
+
+def get_entity_matcher() -> EntityMatcher:
+    """Nomes, slugs e apelidos de todos os itens conhecidos + palavras-chave do jogo."""
+    with _SHARED_LOCK:
+        return _shared_entity_matcher()
 
 
 def _auto_add_item(slug: str) -> Optional[dict]:
@@ -68,29 +256,58 @@ def _auto_add_item(slug: str) -> Optional[dict]:
     if not payload:
         return None
 
-    data = dict(_load_item_data())
-    data[slug] = payload
     try:
-        _save_item_data(data)
+        # grava só este item; o cache dos demais continua válido
+        get_item_store().put(slug, payload)
     except Exception as exc:
-        print(f"[item_context] ERROR saving updated item_data.json: {exc}")
+        print(f"[item_context] ERROR saving item {slug}: {exc}")
+        return None
+    return payload
+
+
+def _get_item_fragment(slug: str) -> Optional[str]:
+    store = get_item_store()
+    fragment = store.fragment(slug)
+    if fragment is not None or slug in store:
+        return fragment
+    if ITEM_FETCH_MODE != "inline":
+        # busca em segundo plano; esta resposta sai sem o contexto do item
+        get_item_enricher().request(slug)
+        return None
+    if not _auto_add_item(slug):
         return None
+    return store.fragment(slug)
+
+
+_GRAPH_LOCK = threading.Lock()
+_graph_state: Optional[Tuple[int, RecipeGraph]] = None
+
+
+def get_recipe_graph() -> RecipeGraph:
+    """Grafo de receitas da base; refeito só quando a base mudou desde a última montagem."""
+    global _graph_state
+    store = get_item_store()
+    with _GRAPH_LOCK:
+        version = store.version
+        if _graph_state is None or _graph_state[0] != version:
+            _graph_state = (version, RecipeGraph.from_items(store.items()))
+        return _graph_state[1]
 
-    _load_item_data.cache_clear()
-    return copy.deepcopy(payload)
+
+def build_recipe_context(prompt: str, slugs: List[str]) -> Optional[str]:
+    """Custo bruto dos itens citados e, se o prompt pede uma taxa ("2/s"), máquinas da cadeia."""
+    graph = get_recipe_graph()
+    rate = parse_rate(prompt)
+    lines = [text for text in (graph.describe(slug, rate) for slug in slugs) if text]
+    if not lines:
+        return None
+    return RECIPE_HEADER + "\n" + "\n".join(lines)
 
 
-def _get_item_payload(slug: str) -> Optional[dict]:
-    data = _load_item_data()
-    entry = data.get(slug) if data else None
-    if not entry:
-        entry = _auto_add_item(slug)
-        if not entry:
-            return None
-    cloned = copy.deepcopy(entry)
-    cloned.setdefault("slug", slug)
-    cloned.setdefault("name", _display_name(slug))
-    return cloned
+def missing_item_slugs(slugs: List[str]) -> List[str]:
+    """Slugs que ainda não estão na base (o contexto deles não entra no prompt agora)."""
+    store = get_item_store()
+    return [slug for slug in slugs if slug not in store]
 
 
 def extract_item_slugs(prompt: str) -> List[str]:
@@ -107,30 +324,57 @@ def extract_item_slugs(prompt: str) -> List[str]:
     return found
 
 
-def build_item_context(prompt: str) -> Optional[str]:
+def find_item_slugs(prompt: str) -> List[str]:
+    """Itens com `[item=...]` e, depois deles, os citados pelo nome ("baú de aço", "steel chest")."""
     slugs = extract_item_slugs(prompt)
+    if not prompt:
+        return slugs
+    seen = set(slugs)
+    mentions = 0
+    for match in get_entity_matcher().find(prompt):
+        if isinstance(match.value, str) and match.value not in seen and mentions < MAX_MENTIONS:
+            seen.add(match.value)
+            slugs.append(match.value)
+            mentions += 1
+    return slugs
+
+
+def mentions_factorio(text: str) -> bool:
+    """Se o texto cita algum item conhecido ou palavra-chave do jogo (uma passada no texto)."""
+    return bool(text) and bool(get_entity_matcher().find(text))
+
+
+def build_item_context(prompt: str) -> Optional[str]:
+    slugs = find_item_slugs(prompt)
     if not slugs:
         return None
-    blocks: List[str] = []
-    for slug in slugs:
-        payload = _get_item_payload(slug)
-        if not payload:
-            continue
-        json_blob = json.dumps(payload, ensure_ascii=False, indent=2)
-        blocks.append(f"[item_info]\n{json_blob}\n[/item_info]")
+    blocks = [fragment for fragment in map(_get_item_fragment, slugs) if fragment]
     if not blocks:
         return None
-    combined = "\n\n".join(blocks)
-    header = "### CONTEXTO AUTOMATICO (gerado pelo parser)"
-    return f"{header}\n\n{combined}"
-
-
-def augment_prompt_with_context(prompt: str) -> str:
     try:
-        ctx = build_item_context(prompt)
+        recipes = build_recipe_context(prompt, slugs)
     except Exception as exc:
-        print(f"[item_context] ERROR building context: {exc}")
-        return prompt
+        # sem as contas o prompt ainda leva os fragmentos
+        print(f"[item_context] ERROR computing recipes: {exc!r}")
+        recipes = None
+    if recipes:
+        blocks.append(recipes)
+    return CONTEXT_HEADER + "\n\n" + "\n\n".join(blocks)
+
+
+def format_prompt_with_context(ctx: Optional[str], prompt: str) -> str:
     if not ctx:
         return prompt
     return f"{ctx}\n\n### MENSAGEM DO USUÁRIO\n{prompt}"
+
+
+def safe_build_item_context(prompt: str) -> Optional[str]:
+    try:
+        return build_item_context(prompt)
+    except Exception as exc:
+        print(f"[item_context] ERROR building context: {exc}")
+        return None
+
+
+def augment_prompt_with_context(prompt: str) -> str:
+    return format_prompt_with_context(safe_build_item_context(prompt), prompt)
@@ -0,0 +1,89 @@
+"""Busca em segundo plano dos itens que ainda não estão na base.
+
+Um slug desconhecido não trava a resposta: ele entra numa fila e threads de
+fundo baixam, processam e gravam o item para as próximas perguntas. Pedidos
+repetidos do mesmo slug enquanto ele está na fila são ignorados, e um slug
+que falhou só volta a ser tentado depois de `retry_after` segundos, então
+uma wiki lenta ou fora do ar nunca soma latência ao chat.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+
+class ItemEnricher:
+    """Fila com deduplicação na frente de `load(slug)` (baixa e grava; devolve o payload ou None)."""
+
+    def __init__(
+        self,
+        load: Callable[[str], Optional[dict]],
+        workers: int = 2,
+        max_pending: int = 256,
+        retry_after: float = 600.0,
+    ):
+        self.load = load
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._failed_until: Dict[str, float] = {}
+        self.loaded = 0
+        self.failed = 0
+        self.dropped = 0
+        for index in range(max(1, workers)):
+            # daemon: um download pendente não segura o encerramento do bot
+            threading.Thread(target=self._work, name=f"item-enricher-{index}", daemon=True).start()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def is_pending(self, slug: str) -> bool:
+        return slug in self._pending
+
+    def request(self, slug: str) -> bool:
+        """Agenda `slug`; devolve False se já está na fila, falhou há pouco ou a fila está cheia."""
+        with self._lock:
+            if slug in self._pending:
+                return False
+            if self._failed_until.get(slug, 0.0) > time.monotonic():
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.add(slug)
+        self._queue.put(slug)
+        return True
+
+    def _work(self) -> None:
+        while True:
+            slug = self._queue.get()
+            payload = None
+            try:
+                payload = self.load(slug)
+            except Exception as exc:
+                print(f"[item_enricher] ERROR loading {slug}: {exc!r}")
+            with self._lock:
+                self._pending.discard(slug)
+                if payload:
+                    self.loaded += 1
+                    self._failed_until.pop(slug, None)
+                else:
+                    self.failed += 1
+                    self._failed_until[slug] = time.monotonic() + self.retry_after
+            if payload:
+                print(f"[item_enricher] loaded {slug} ({self.pending} pending)")
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar (útil em scripts); devolve False se o tempo acabar."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
@@ -0,0 +1,302 @@
+"""Base de itens do Factorio indexada por slug (SQLite) com LRU em memória.
+
+Substitui o `item_data.json` carregado e reescrito por inteiro: cada item é
+uma linha, lida sob demanda pela chave primária e gravada sozinha (um
+UPSERT). Os itens lidos ficam num LRU invalidado por chave quando o item
+muda. O `item_data.json` continua como semente: os itens dele que faltam no
+banco são importados na abertura.
+
+Com um `renderer`, cada item guarda também o seu fragmento de contexto (o
+texto compacto que vai para o prompt), gerado na gravação e lido pronto
+depois. O `renderer_version` marca o formato: fragmentos de outra versão, ou
+de itens gravados sem renderer (ex.: pelo `import` abaixo), são refeitos na
+primeira leitura.
+
+Importação/exportação manual:
+    python3 -m IA.item_store import IA/item_data.json IA/ITEMS/items.db
+    python3 -m IA.item_store export IA/ITEMS/items.db item_data.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    slug TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    fragment TEXT,
+    fragment_version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class ItemStore:
+    """Itens por slug; seguro para uso a partir de várias threads.
+
+    `get` devolve uma cópia do payload, então quem chama pode alterá-la sem
+    sujar o cache; `fragment` devolve o texto pronto, sem cópia nem JSON.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = 256,
+        renderer: Optional[Callable[[str, dict], str]] = None,
+        renderer_version: int = 1,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.cache_size = max(1, cache_size)
+        self.renderer = renderer
+        self.renderer_version = renderer_version
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._fragments: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # sobe a cada gravação/remoção; quem deriva dados da base inteira compara com ele
+        self.version = 0
+        self._listeners: List[Callable[[str, Optional[dict]], None]] = []
+
+    def _upgrade_schema(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(items)")}
+        with self._conn:
+            if "fragment" not in columns:
+                # bancos anteriores aos fragmentos: ficam NULL e são gerados na primeira leitura
+                self._conn.execute("ALTER TABLE items ADD COLUMN fragment TEXT")
+                self._conn.execute("ALTER TABLE items ADD COLUMN fragment_version INTEGER NOT NULL DEFAULT 0")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def __contains__(self, slug: str) -> bool:
+        with self._lock:
+            if slug in self._cache:
+                return True
+            return self._conn.execute("SELECT 1 FROM items WHERE slug = ?", (slug,)).fetchone() is not None
+
+    def _remember(self, cache: OrderedDict, slug: str, value) -> None:
+        cache[slug] = value
+        cache.move_to_end(slug)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _forget(self, slug: str) -> None:
+        self.version += 1
+        self._cache.pop(slug, None)
+        self._fragments.pop(slug, None)
+
+    def add_listener(self, listener: Callable[[str, Optional[dict]], None]) -> None:
+        """`listener(slug, payload)` depois de cada gravação (`payload` None = item removido)."""
+        self._listeners.append(listener)
+
+    def _notify(self, changes: Iterable[Tuple[str, Optional[dict]]]) -> None:
+        if not self._listeners:
+            return
+        for slug, payload in changes:
+            for listener in self._listeners:
+                try:
+                    listener(slug, payload)
+                except Exception as exc:
+                    print(f"[item_store] ERROR notifying change of {slug}: {exc!r}")
+
+    def _render(self, slug: str, payload: dict) -> Optional[str]:
+        if self.renderer is None:
+            return None
+        try:
+            return self.renderer(slug, payload)
+        except Exception as exc:
+            print(f"[item_store] ERROR rendering fragment for {slug}: {exc!r}")
+            return None
+
+    def _row(self, slug: str, payload: dict, now: str) -> Tuple[str, str, str, Optional[str], int]:
+        fragment = self._render(slug, payload)
+        version = self.renderer_version if fragment is not None else 0
+        return slug, json.dumps(payload, ensure_ascii=False), now, fragment, version
+
+    def get(self, slug: str) -> Optional[dict]:
+        with self._lock:
+            payload = self._cache.get(slug)
+            if payload is not None:
+                self.hits += 1
+                self._cache.move_to_end(slug)
+                return copy.deepcopy(payload)
+            self.misses += 1
+            row = self._conn.execute("SELECT payload FROM items WHERE slug = ?", (slug,)).fetchone()
+            if row is None:
+                return None
+            payload = json.loads(row[0])
+            self._remember(self._cache, slug, payload)
+            return copy.deepcopy(payload)
+
+    def fragment(self, slug: str) -> Optional[str]:
+        """Fragmento de contexto do item (None se o item não existe ou não há renderer)."""
+        with self._lock:
+            fragment = self._fragments.get(slug)
+            if fragment is not None:
+                self.hits += 1
+                self._fragments.move_to_end(slug)
+                return fragment
+            self.misses += 1
+            row = self._conn.execute(
+                "SELECT payload, fragment, fragment_version FROM items WHERE slug = ?", (slug,)
+            ).fetchone()
+            if row is None:
+                return None
+            fragment = row[1]
+            if fragment is None or row[2] != self.renderer_version:
+                fragment = self._render(slug, json.loads(row[0]))
+                if fragment is None:
+                    return None
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE items SET fragment = ?, fragment_version = ? WHERE slug = ?",
+                        (fragment, self.renderer_version, slug),
+                    )
+            self._remember(self._fragments, slug, fragment)
+            return fragment
+
+    def put(self, slug: str, payload: dict) -> None:
+        """Grava (ou substitui) um único item e invalida só a chave dele no cache."""
+        row = self._row(slug, payload, _now())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO items (slug, payload, updated_at, fragment, fragment_version) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(slug) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at,"
+                " fragment = excluded.fragment, fragment_version = excluded.fragment_version",
+                row,
+            )
+            self._forget(slug)
+        self._notify([(slug, payload)])
+
+    def put_many(self, items: Iterable[Tuple[str, dict]], replace: bool = True) -> int:
+        """Grava vários itens numa transação; com `replace=False` mantém os que já existem."""
+        now = _now()
+        items = list(items)
+        rows = [self._row(slug, payload, now) for slug, payload in items]
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"{verb} INTO items (slug, payload, updated_at, fragment, fragment_version) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            written = self._conn.total_changes - before
+            for row in rows:
+                self._forget(row[0])
+        # com replace=False os que já existiam não mudaram, mas avisar de novo é inofensivo
+        self._notify(items)
+        return written
+
+    def delete(self, slug: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM items WHERE slug = ?", (slug,))
+            self._forget(slug)
+        if cursor.rowcount > 0:
+            self._notify([(slug, None)])
+        return cursor.rowcount > 0
+
+    def slugs(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT slug FROM items ORDER BY slug")]
+
+    def items(self) -> Iterable[Tuple[str, dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT slug, payload FROM items ORDER BY slug").fetchall()
+        for slug, blob in rows:
+            yield slug, json.loads(blob)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def load_json_items(json_path: str) -> Dict[str, dict]:
+    """Lê o formato antigo (`{"slug": {...}, ...}`)."""
+    with open(json_path, "r", encoding="utf-8") as handler:
+        payload = json.load(handler)
+    if not isinstance(payload, dict):
+        return {}
+    return {slug: entry for slug, entry in payload.items() if isinstance(entry, dict)}
+
+
+def seed_from_json(store: ItemStore, json_path: str) -> int:
+    """Importa os itens do JSON que ainda não estão no banco; devolve quantos entraram."""
+    if not json_path or not os.path.exists(json_path):
+        return 0
+    return store.put_many(load_json_items(json_path).items(), replace=False)
+
+
+def open_item_store(
+    db_path: str,
+    seed_json: Optional[str] = None,
+    cache_size: int = 256,
+    renderer: Optional[Callable[[str, dict], str]] = None,
+    renderer_version: int = 1,
+) -> ItemStore:
+    store = ItemStore(db_path, cache_size=cache_size, renderer=renderer, renderer_version=renderer_version)
+    if seed_json:
+        try:
+            imported = seed_from_json(store, seed_json)
+            if imported:
+                print(f"[item_store] imported {imported} items from {seed_json}")
+        except Exception as exc:
+            print(f"[item_store] ERROR importing {seed_json}: {exc}")
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ferramentas da base de itens")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    import_cmd = sub.add_parser("import", help="Importa um item_data.json para o banco SQLite")
+    import_cmd.add_argument("json_path")
+    import_cmd.add_argument("db_path")
+    import_cmd.add_argument("--replace", action="store_true", help="Sobrescreve itens que já existem")
+    export_cmd = sub.add_parser("export", help="Exporta o banco para um JSON no formato antigo")
+    export_cmd.add_argument("db_path")
+    export_cmd.add_argument("json_path")
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        store = ItemStore(args.db_path)
+        try:
+            imported = store.put_many(load_json_items(args.json_path).items(), replace=args.replace)
+            print(f"{imported} itens importados; total {len(store)}")
+        finally:
+            store.close()
+        return
+
+    store = ItemStore(args.db_path)
+    try:
+        data = dict(store.items())
+    finally:
+        store.close()
+    with open(args.json_path, "w", encoding="utf-8") as handler:
+        json.dump(data, handler, ensure_ascii=False, indent=2)
+    print(f"{len(data)} itens exportados para {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Distribui as gerações entre vários backends Ollama (hosts e/ou modelos).
+
+Cada backend tem um semáforo com o número máximo de gerações simultâneas;
+prompts curtos vão para o grupo de modelos pequenos (se configurado) e
+prompts idênticos em andamento são gerados uma única vez e compartilhados.
+Gerações de segundo plano (resumos do histórico) passam pelos mesmos
+semáforos, uma por vez, e só começam quando nenhuma resposta de chat está
+gerando ou esperando backend.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class Backend:
+    """Um modelo em um daemon Ollama, com limite de requisições simultâneas."""
+
+    def __init__(self, client, model: str, max_concurrency: int = 1, name: Optional[str] = None):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.name = name or model
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.completed = 0
+        self.failures = 0
+        # após uma falha o backend vai para o fim da fila até `cooldown_until`
+        self.cooldown_until = 0.0
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / self.max_concurrency
+
+    def __repr__(self) -> str:
+        return f"Backend({self.name!r}, {self.in_flight}/{self.max_concurrency})"
+
+
+def parse_backends(
+    spec: str, default_model: str, default_concurrency: int = 1
+) -> List[Tuple[Optional[str], str, int]]:
+    """Lê `host|modelo|concorrência` separados por vírgula; campos vazios usam os padrões.
+
+    Ex.: "http://10.0.0.2:11434|Yuno:latest|2, http://10.0.0.3:11434" ->
+    [("http://10.0.0.2:11434", "Yuno:latest", 2), ("http://10.0.0.3:11434", default_model, default_concurrency)]
+    """
+    backends = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        fields = [field.strip() for field in item.split("|")] + ["", "", ""]
+        host, model, concurrency = fields[:3]
+        backends.append((host or None, model or default_model, int(concurrency or default_concurrency)))
+    return backends
+
+
+def build_backends(
+    specs: Sequence[Tuple[Optional[str], str, int]], client_factory: Callable
+) -> List[Backend]:
+    """Cria os backends reaproveitando um cliente por host."""
+    clients: Dict[Optional[str], object] = {}
+    backends = []
+    for host, model, concurrency in specs:
+        if host not in clients:
+            clients[host] = client_factory(host=host)
+        backends.append(Backend(clients[host], model, concurrency, name=f"{host or 'local'}/{model}"))
+    return backends
+
+
+class _Generation:
+    """Uma geração em andamento compartilhada por todos que pediram o mesmo prompt."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class LLMDispatcher:
+    """Front-end de `chat` sobre vários `Backend`.
+
+    `stream()` escolhe o grupo (pequeno se o texto de `hint`, ou da última
+    mensagem, tiver até `small_prompt_chars`), pega o backend menos carregado
+    do grupo e segura o semáforo dele durante toda a geração. Se o backend
+    falhar antes do primeiro token, tenta os outros do grupo. Uma segunda
+    chamada com as mesmas mensagens enquanto a primeira gera recebe os mesmos
+    tokens, sem nova requisição ao modelo. A chave é a lista de mensagens
+    inteira, e no chat ela traz o histórico e o nome de quem perguntou: só se
+    juntam duplicatas exatas do mesmo jogador (linha repetida, reenvio). Entre
+    jogadores quem reaproveita respostas é o `ResponseCache`.
+
+    Com `background=True` a geração tem prioridade baixa: no máximo
+    `background_concurrency` delas ao mesmo tempo, e cada uma espera até
+    não haver nenhuma geração de chat em andamento antes de pegar o backend.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Backend],
+        small_backends: Sequence[Backend] = (),
+        small_prompt_chars: int = 0,
+        failure_cooldown: float = 30.0,
+        background_concurrency: int = 1,
+    ):
+        if not backends:
+            raise ValueError("at least one backend is required")
+        self.backends = list(backends)
+        self.small_backends = list(small_backends)
+        self.small_prompt_chars = small_prompt_chars
+        self.failure_cooldown = failure_cooldown
+        self._inflight: Dict[str, _Generation] = {}
+        self._next = 0
+        self.coalesced = 0
+        self.small_routed = 0
+        self.background = 0
+        self._background = asyncio.Semaphore(max(1, background_concurrency))
+        # gerações de chat em andamento (gerando ou na fila de um semáforo)
+        self._foreground = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backends": {
+                backend.name: f"{backend.in_flight}/{backend.max_concurrency} ok={backend.completed} fail={backend.failures}"
+                for backend in self.backends + self.small_backends
+            },
+            "coalesced": self.coalesced,
+            "small_routed": self.small_routed,
+            "background": self.background,
+        }
+
+    def _group(self, messages: Sequence[Dict[str, str]], hint: Optional[str]) -> List[Backend]:
+        if self.small_backends and self.small_prompt_chars > 0:
+            text = hint if hint is not None else (messages[-1]["content"] if messages else "")
+            if len(text) <= self.small_prompt_chars:
+                return self.small_backends
+        return self.backends
+
+    def _ordered(self, group: List[Backend]) -> List[Backend]:
+        """Saudáveis e menos carregados primeiro; empates alternam (round robin)."""
+        self._next += 1
+        count = len(group)
+        now = time.monotonic()
+        rotated = [group[(self._next + offset) % count] for offset in range(count)]
+        return sorted(rotated, key=lambda backend: (backend.cooldown_until > now, backend.load))
+
+    async def _produce(
+        self, generation: _Generation, group: List[Backend], messages: list, model: Optional[str] = None
+    ) -> None:
+        error: Optional[BaseException] = None
+        try:
+            for backend in self._ordered(group):
+                async with backend.semaphore:
+                    backend.in_flight += 1
+                    try:
+                        stream = await backend.client.chat(
+                            model=model or backend.model, messages=messages, stream=True
+                        )
+                        async for part in stream:
+                            token = part["message"]["content"]
+                            if token:
+                                async with generation.changed:
+                                    generation.parts.append(token)
+                                    generation.changed.notify_all()
+                        backend.completed += 1
+                        error = None
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as exc:
+                        backend.failures += 1
+                        backend.cooldown_until = time.monotonic() + self.failure_cooldown
+                        error = exc
+                        print(f"[llm_dispatcher] ERROR on backend {backend.name}: {exc!r}")
+                        if generation.parts:
+                            # já houve tokens: não dá para recomeçar em outro backend
+                            break
+                    finally:
+                        backend.in_flight -= 1
+        except asyncio.CancelledError as exc:
+            error = exc
+        finally:
+            async with generation.changed:
+                generation.error = error
+                generation.done = True
+                generation.changed.notify_all()
+
+    async def _produce_foreground(self, generation: _Generation, group: List[Backend], messages: list, model) -> None:
+        self._foreground += 1
+        self._idle.clear()
+        try:
+            await self._produce(generation, group, messages, model)
+        finally:
+            self._foreground -= 1
+            if not self._foreground:
+                self._idle.set()
+
+    async def _produce_background(self, generation: _Generation, group: List[Backend], messages: list, model) -> None:
+        try:
+            async with self._background:
+                # cede a vez ao chat: só pega o backend com nenhuma resposta em andamento
+                while not self._idle.is_set():
+                    await self._idle.wait()
+                self.background += 1
+                await self._produce(generation, group, messages, model)
+        except asyncio.CancelledError as exc:
+            async with generation.changed:
+                generation.error = exc
+                generation.done = True
+                generation.changed.notify_all()
+
+    async def stream(
+        self,
+        messages: list,
+        hint: Optional[str] = None,
+        model: Optional[str] = None,
+        background: bool = False,
+    ) -> AsyncIterator[str]:
+        """Gera em streaming: produz os pedaços de texto conforme o modelo os devolve.
+
+        `model` troca o modelo dos backends escolhidos (ex.: modelo de resumo)
+        sem mudar os limites de concorrência de cada host.
+        """
+        group = self._group(messages, hint)
+        small = group is self.small_backends
+        if small:
+            self.small_routed += 1
+        # tudo que muda a resposta entra na chave; histórico diferente = geração diferente
+        key = hashlib.sha1(
+            json.dumps([small, model, background, messages], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        generation = self._inflight.get(key)
+        if generation is None:
+            generation = _Generation()
+            self._inflight[key] = generation
+            produce = self._produce_background if background else self._produce_foreground
+            generation.task = asyncio.ensure_future(produce(generation, group, messages, model))
+            generation.task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        generation.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with generation.changed:
+                    await generation.changed.wait_for(
+                        lambda: len(generation.parts) > position or generation.done
+                    )
+                    new = generation.parts[position:]
+                    finished = generation.done
+                position += len(new)
+                for part in new:
+                    yield part
+                if finished:
+                    if generation.error is not None:
+                        raise generation.error
+                    return
+        finally:
+            generation.subscribers -= 1
+            if not generation.subscribers and not generation.done and generation.task is not None:
+                # ninguém mais está esperando esta geração
+                generation.task.cancel()
+
+    async def complete(
+        self,
+        messages: list,
+        hint: Optional[str] = None,
+        model: Optional[str] = None,
+        background: bool = False,
+    ) -> str:
+        """Gera a resposta inteira (também coalescida com pedidos idênticos em andamento)."""
+        return "".join([part async for part in self.stream(messages, hint, model, background)])
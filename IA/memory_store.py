@@ -0,0 +1,300 @@
+"""Memória de conversas em SQLite (modo WAL) com buffer circular em memória.
+
+Substitui o `memorias.json` reescrito por inteiro a cada mensagem: gravar uma
+interação é um INSERT (O(1)) e ler as últimas N usa o índice da chave
+primária ou o buffer circular, sem varrer o histórico inteiro.
+
+Migração manual do formato antigo:
+    python3 -m IA.memory_store migrate IA/MEMORIAS/memorias.json IA/MEMORIAS/memorias.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from IA.chat_protocol import parse_chat_line
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    response TEXT NOT NULL,
+    player TEXT
+);
+CREATE TABLE IF NOT EXISTS digests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player TEXT,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS digests_player ON digests (player, last_id);
+"""
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class MemoryStore:
+    """Histórico append-only; seguro para uso a partir de várias threads."""
+
+    def __init__(self, path: str, ring_size: int = 256):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit sem fsync por transação; o checkpoint garante a durabilidade
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._ring: deque = deque(maxlen=max(1, ring_size))
+        self._digest_cache: Dict[Optional[str], Tuple[int, List[Dict[str, object]]]] = {}
+        self._count = self._conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+        self._ring.extend(self._query_last(self._ring.maxlen))
+
+    def _upgrade_schema(self) -> None:
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(interactions)")}
+        with self._conn:
+            if "player" not in columns:
+                # bancos anteriores às sessões por jogador: cria a coluna e preenche pelo prompt
+                self._conn.execute("ALTER TABLE interactions ADD COLUMN player TEXT")
+                rows = self._conn.execute("SELECT id, prompt FROM interactions").fetchall()
+                self._conn.executemany(
+                    "UPDATE interactions SET player = ? WHERE id = ?",
+                    [(_player_of(row["prompt"]), row["id"]) for row in rows],
+                )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS interactions_player ON interactions (player, id)"
+            )
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict[str, object]:
+        return {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "player": row["player"],
+            "prompt": row["prompt"],
+            "response": row["response"],
+        }
+
+    def _query_last(self, n: int) -> List[Dict[str, object]]:
+        rows = self._conn.execute(
+            "SELECT * FROM interactions ORDER BY id DESC LIMIT ?", (n,)
+        ).fetchall()
+        return [self._to_entry(row) for row in reversed(rows)]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(
+        self, prompt: str, response: str, timestamp: Optional[str] = None, player: Optional[str] = None
+    ) -> Dict[str, object]:
+        timestamp = timestamp or _now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO interactions (timestamp, prompt, response, player) VALUES (?, ?, ?, ?)",
+                (timestamp, prompt, response, player),
+            )
+            entry = {
+                "id": cursor.lastrowid,
+                "timestamp": timestamp,
+                "player": player,
+                "prompt": prompt,
+                "response": response,
+            }
+            self._ring.append(entry)
+            self._count += 1
+        return entry
+
+    def extend(self, entries: Iterable[Dict[str, object]]) -> int:
+        """Insere várias interações em uma única transação (usado pela migração)."""
+        rows = [
+            (
+                str(e.get("timestamp") or _now()),
+                str(e.get("prompt") or ""),
+                str(e.get("response") or ""),
+                e.get("player") or _player_of(str(e.get("prompt") or "")),
+            )
+            for e in entries
+            if isinstance(e, dict)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO interactions (timestamp, prompt, response, player) VALUES (?, ?, ?, ?)", rows
+            )
+            self._count += len(rows)
+            self._ring.clear()
+            self._ring.extend(self._query_last(self._ring.maxlen))
+        return len(rows)
+
+    def last(self, n: int) -> List[Dict[str, object]]:
+        """Últimas `n` interações em ordem cronológica."""
+        if n <= 0:
+            return []
+        with self._lock:
+            if n <= len(self._ring) or len(self._ring) == self._count:
+                return list(self._ring)[-n:]
+            return self._query_last(n)
+
+    def last_for_player(self, player: str, n: int) -> List[Dict[str, object]]:
+        """Últimas `n` interações de um jogador (índice `player, id`), em ordem cronológica."""
+        if n <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM interactions WHERE player = ? ORDER BY id DESC LIMIT ?", (player, n)
+            ).fetchall()
+        return [self._to_entry(row) for row in reversed(rows)]
+
+    def entries_after(self, after_id: int, limit: int) -> List[Dict[str, object]]:
+        """Até `limit` interações com id > `after_id`, em ordem de id (indexação incremental)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM interactions WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def get_many(self, ids: Iterable[int]) -> List[Dict[str, object]]:
+        """Interações pelos ids (chave primária), em ordem cronológica."""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM interactions WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def _last_digested_id(self, player: Optional[str]) -> int:
+        row = self._conn.execute(
+            "SELECT MAX(last_id) FROM digests WHERE player IS ?", (player,)
+        ).fetchone()
+        return row[0] or 0
+
+    def undigested(self, player: Optional[str], limit: int) -> List[Dict[str, object]]:
+        """Interações mais antigas do jogador ainda não cobertas por um resumo."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM interactions WHERE player IS ? AND id > ? ORDER BY id LIMIT ?",
+                (player, self._last_digested_id(player), limit),
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def pending_digest_counts(self) -> Dict[Optional[str], int]:
+        """Quantidade de interações sem resumo, por jogador."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT i.player, COUNT(*) FROM interactions i"
+                " WHERE i.id > COALESCE((SELECT MAX(d.last_id) FROM digests d WHERE d.player IS i.player), 0)"
+                " GROUP BY i.player"
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def add_digest(
+        self, player: Optional[str], first_id: int, last_id: int, summary: str
+    ) -> Dict[str, object]:
+        created_at = _now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO digests (player, first_id, last_id, created_at, summary) VALUES (?, ?, ?, ?, ?)",
+                (player, first_id, last_id, created_at, summary),
+            )
+            self._digest_cache.pop(player, None)
+        return {
+            "id": cursor.lastrowid,
+            "player": player,
+            "first_id": first_id,
+            "last_id": last_id,
+            "created_at": created_at,
+            "summary": summary,
+        }
+
+    def digests(self, player: Optional[str], limit: int = 5) -> List[Dict[str, object]]:
+        """Resumos mais recentes do jogador, em ordem cronológica (em cache até o próximo resumo)."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            cached_limit, cached = self._digest_cache.get(player, (0, []))
+            if cached_limit < limit:
+                rows = self._conn.execute(
+                    "SELECT * FROM digests WHERE player IS ? ORDER BY last_id DESC LIMIT ?", (player, limit)
+                ).fetchall()
+                cached = [dict(row) for row in reversed(rows)]
+                self._digest_cache[player] = (limit, cached)
+        return cached[-limit:]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _player_of(prompt: str) -> Optional[str]:
+    return parse_chat_line(prompt).player if prompt else None
+
+
+def load_json_interactions(json_path: str) -> List[dict]:
+    """Lê o formato antigo (`{"interactions": [...]}` ou lista direta)."""
+    with open(json_path, "r", encoding="utf-8") as handler:
+        data = json.load(handler)
+    if isinstance(data, dict) and "interactions" in data:
+        return list(data["interactions"])
+    if isinstance(data, list):
+        return data
+    return []
+
+
+def migrate_json(json_path: str, store: MemoryStore, rename: bool = True) -> int:
+    """Importa `memorias.json` para o store (uma vez) e renomeia o arquivo para `.migrated`."""
+    if not os.path.exists(json_path):
+        return 0
+    imported = store.extend(load_json_interactions(json_path))
+    if rename:
+        os.replace(json_path, json_path + ".migrated")
+    return imported
+
+
+def open_memory_store(db_path: str, legacy_json: Optional[str] = None, ring_size: int = 256) -> MemoryStore:
+    """Abre o store e, se ele estiver vazio, migra o `memorias.json` legado."""
+    store = MemoryStore(db_path, ring_size=ring_size)
+    if legacy_json and len(store) == 0 and os.path.exists(legacy_json):
+        try:
+            imported = migrate_json(legacy_json, store)
+            print(f"[memory_store] migrated {imported} interactions from {legacy_json}")
+        except Exception as exc:
+            print(f"[memory_store] ERROR migrating {legacy_json}: {exc}")
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ferramentas da memória de conversas")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    migrate = sub.add_parser("migrate", help="Importa memorias.json para o banco SQLite")
+    migrate.add_argument("json_path")
+    migrate.add_argument("db_path")
+    migrate.add_argument("--keep", action="store_true", help="Não renomeia o JSON após importar")
+    args = parser.parse_args()
+
+    store = MemoryStore(args.db_path)
+    try:
+        imported = migrate_json(args.json_path, store, rename=not args.keep)
+        print(f"{imported} interações importadas; total {len(store)}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Gravação de `resposta.json` (e da imagem anexada) fora do caminho da resposta.
+
+O envio para o jogo não espera disco: a resposta vai para uma fila e uma
+thread de fundo grava o arquivo. As respostas que chegam juntas formam um
+lote: cada uma ainda é gravada (rename atômico do `resposta.json`, na
+ordem, com a sua imagem), mas os fsyncs ficam para o fim do lote, um por
+arquivo que sobra no disco e um por diretório (antes eram dois fsyncs por
+resposta, em série com o RCON). Com `coalesce=True` só a última resposta
+de cada lote é gravada.
+
+A imagem mais recente de `IA/IMGS` é acompanhada por inotify (ou, sem ele,
+pelo mtime do diretório), sem glob + stat de todos os arquivos a cada
+resposta. Ela é copiada para `script-output` por `copy_file_range`/
+`sendfile` dentro do kernel; com `link_images=True` vai por hardlink (sem
+copiar bytes), mas aí a cópia divide o inode com a original e muda junto
+se a imagem de `IA/IMGS` for reescrita no lugar.
+"""
+
+from __future__ import annotations
+
+import errno
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from IA.chat_ingest import Inotify
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+
+class LatestImageTracker:
+    """Imagem modificada mais recentemente em `directory`, mantida de forma incremental.
+
+    Com inotify, cada chamada só olha (stat) os arquivos que mudaram desde a
+    anterior. Sem inotify, o diretório só é relido quando o mtime dele muda
+    (arquivo criado, renomeado ou removido); reescrever no lugar uma imagem
+    que não é a mais recente passa despercebido até a próxima releitura.
+    """
+
+    def __init__(self, directory: str, extensions: Tuple[str, ...] = IMAGE_EXTENSIONS, watch: bool = True):
+        self.directory = directory
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self._newest: Optional[Tuple[int, str]] = None
+        self._dir_mtime: Optional[int] = None
+        self._scanned = False
+        self._watch: Optional[Inotify] = None
+        if watch and os.path.isdir(directory):
+            try:
+                self._watch = Inotify(directory)
+            except (OSError, AttributeError) as exc:
+                print(f"[output_writer] inotify indisponível em {directory} ({exc}); usando mtime do diretório")
+
+    def _is_image(self, name: str) -> bool:
+        return name.lower().endswith(self.extensions)
+
+    def _scan(self) -> None:
+        newest = None
+        try:
+            self._dir_mtime = os.stat(self.directory).st_mtime_ns
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not self._is_image(entry.name):
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+                    if newest is None or mtime > newest[0]:
+                        newest = (mtime, entry.path)
+        except FileNotFoundError:
+            self._dir_mtime = None
+        self._newest = newest
+        self._scanned = True
+
+    def _offer(self, path: str) -> None:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if self._newest is None or mtime >= self._newest[0]:
+            self._newest = (mtime, path)
+
+    def latest(self) -> Optional[str]:
+        if not self._scanned:
+            self._scan()
+        elif self._watch is not None:
+            names = self._watch.read_names()
+            if "" in names:
+                # evento sem nome (ex.: fila do inotify transbordou): relê tudo
+                self._scan()
+            else:
+                for name in dict.fromkeys(names):
+                    if self._is_image(name):
+                        self._offer(os.path.join(self.directory, name))
+        else:
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._dir_mtime:
+                self._scan()
+
+        if self._newest is not None:
+            try:
+                # a mais recente pode ter sido apagada ou reescrita no lugar
+                self._newest = (os.stat(self._newest[1]).st_mtime_ns, self._newest[1])
+            except FileNotFoundError:
+                self._scan()
+        return self._newest[1] if self._newest else None
+
+    def close(self) -> None:
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
+
+
+def _copy_range(src_fd: int, dst_fd: int, size: int) -> str:
+    """Copia `size` bytes dentro do kernel; devolve o método usado."""
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < size:
+                sent = os.copy_file_range(src_fd, dst_fd, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return "copy_file_range"
+        except OSError as exc:
+            if copied or exc.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while copied < size:
+                sent = os.sendfile(dst_fd, src_fd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return "sendfile"
+        except OSError as exc:
+            if copied or exc.errno not in (errno.ENOSYS, errno.EINVAL):
+                raise
+    with os.fdopen(os.dup(src_fd), "rb") as reader, os.fdopen(os.dup(dst_fd), "wb") as writer:
+        shutil.copyfileobj(reader, writer)
+    return "copy"
+
+
+class OutputWriter:
+    """Thread que grava as respostas enviadas com `submit(data)`.
+
+    `data` é o dicionário do `resposta.json`; a thread acrescenta
+    `data["image"]` (nome da imagem copiada para `output_dir`, ou None).
+    Respostas que chegam com menos de `linger` segundos de diferença saem no
+    mesmo lote e dividem os fsyncs.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        output_dir: str,
+        images: Optional[LatestImageTracker] = None,
+        link_images: bool = False,
+        linger: float = 0.05,
+        coalesce: bool = False,
+    ):
+        self.output_file = output_file
+        self.output_dir = output_dir
+        self.images = images
+        self.link_images = link_images
+        self.linger = max(0.0, linger)
+        self.coalesce = coalesce
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self.stats: Dict[str, int] = {"batches": 0, "written": 0, "coalesced": 0, "fsyncs": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: dict) -> None:
+        """Agenda a gravação; nunca bloqueia quem chama."""
+        self._queue.put(data)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Grava o que está na fila e encerra a thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.images is not None:
+            self.images.close()
+
+    def _next_batch(self) -> Tuple[List[dict], bool]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while batch[-1] is not None:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        stop = batch[-1] is None
+        return [data for data in batch if data is not None], stop
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                if self.coalesce:
+                    self.stats["coalesced"] += len(batch) - 1
+                    batch = batch[-1:]
+                self._write_batch(batch)
+                self.stats["batches"] += 1
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        written: List[str] = []
+        for data in batch:
+            try:
+                written.extend(self._write(data))
+                self.stats["written"] += 1
+            except Exception as exc:
+                self.stats["errors"] += 1
+                print(f"[output_writer] ERROR writing {self.output_file}: {exc!r}")
+        if not written:
+            return
+        # um fsync por arquivo que ficou no disco e um por diretório (torna os renames duráveis)
+        directories = {os.path.dirname(os.path.abspath(path)) for path in written}
+        for path in list(dict.fromkeys(written)) + sorted(directories):
+            try:
+                self._fsync_path(path)
+            except FileNotFoundError:
+                # imagem já substituída/removida por outra resposta do lote
+                continue
+            except OSError as exc:
+                self.stats["errors"] += 1
+                print(f"[output_writer] ERROR syncing {path}: {exc!r}")
+
+    def _fsync_path(self, path: str) -> None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            self.stats["fsyncs"] += 1
+        finally:
+            os.close(fd)
+
+    def _attach_image(self, data: dict) -> Optional[str]:
+        """Coloca a imagem mais recente em `output_dir` como `<id><ext>`; devolve o método usado.
+
+        O fsync da cópia fica para o fim do lote (`_write_batch`).
+        """
+        source = self.images.latest() if self.images is not None else None
+        data["image"] = None
+        if source is None:
+            return None
+        name = f"{data['id']}{os.path.splitext(source)[1]}"
+        dest = os.path.join(self.output_dir, name)
+        tmp = dest + ".tmp"
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        method = None
+        if self.link_images:
+            try:
+                # hardlink: mesmo inode, nenhum byte copiado (só no mesmo sistema de arquivos)
+                os.link(source, tmp)
+                method = "link"
+            except OSError:
+                method = None
+        if method is None:
+            with open(source, "rb") as reader, open(tmp, "wb") as writer:
+                method = _copy_range(reader.fileno(), writer.fileno(), os.fstat(reader.fileno()).st_size)
+        os.replace(tmp, dest)
+        data["image"] = name
+        return method
+
+    def _write(self, data: dict) -> List[str]:
+        """Grava uma resposta (rename atômico); devolve os arquivos a sincronizar no fim do lote."""
+        written = []
+        try:
+            method = self._attach_image(data)
+        except Exception as exc:
+            print(f"[output_writer] ERROR handling image: {exc!r}")
+            data["image"] = None
+            method = None
+        if method is not None:
+            written.append(os.path.join(self.output_dir, data["image"]))
+        tmp_file = self.output_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as handler:
+            json.dump(data, handler, ensure_ascii=False)
+        os.replace(tmp_file, self.output_file)
+        written.append(self.output_file)
+        image = f", image {data['image']} via {method}" if method else ""
+        print(f"[output_writer] WROTE: {self.output_file} (atomic{image})")
+        return written
@@ -1,21 +1,98 @@
 #!/usr/bin/env python3
+import asyncio
 import socket
 import struct
 
+# Tipos de pacote do protocolo Source RCON
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH = 3
+
+_HEADER = struct.Struct('<iii')
+_SIZE = struct.Struct('<i')
+
+
+def _pack_packet(request_id, packet_type, body):
+    body_bytes = body.encode('utf-8') + b'\x00\x00'
+    size = len(body_bytes) + 8
+    return _HEADER.pack(size, request_id, packet_type) + body_bytes
+
+
+def _unpack_payload(data):
+    request_id, packet_type = struct.unpack_from('<ii', data, 0)
+    # body ends with two null bytes (decodifica direto do buffer, sem copiar)
+    body = str(data[8:-2], 'utf-8', 'ignore')
+    return (request_id, packet_type, body)
+
+
+class RconFramer:
+    """Buffer de recepção pré-alocado que separa o stream TCP em pacotes RCON.
+
+    O socket escreve direto em `write_view()` (via `recv_into`) e `packets()`
+    decodifica os pacotes completos a partir de um `memoryview`, sem o
+    `data += chunk` que copiava o buffer inteiro a cada leitura. Só o resto
+    parcial de um pacote é movido para o início do buffer; o buffer só cresce
+    quando um único pacote não cabe nele.
+    """
+
+    def __init__(self, capacity=64 * 1024):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def write_view(self, min_free=4096):
+        if len(self._buf) - self._end < min_free:
+            pending = self._end - self._start
+            if len(self._buf) - pending >= min_free:
+                # compacta: move só o pacote parcial para o início
+                self._view[:pending] = bytes(self._view[self._start:self._end])
+            else:
+                grown = bytearray(max(len(self._buf) * 2, pending + min_free))
+                grown[:pending] = self._view[self._start:self._end]
+                self._buf = grown
+                self._view = memoryview(grown)
+            self._start = 0
+            self._end = pending
+        return self._view[self._end:]
+
+    def commit(self, n):
+        self._end += n
+
+    def packets(self):
+        view = self._view
+        while self._end - self._start >= 4:
+            size = _SIZE.unpack_from(view, self._start)[0]
+            if size < 10:
+                raise ConnectionError(f'Pacote RCON inválido (size={size})')
+            if self._end - self._start - 4 < size:
+                break
+            begin = self._start + 4
+            self._start = begin + size
+            yield _unpack_payload(view[begin:begin + size])
+        if self._start == self._end:
+            self._start = self._end = 0
+
+
 class FactorioRCON:
-    def __init__(self, host='localhost', port=27015, password=''):
+    def __init__(self, host='localhost', port=27015, password='', use_sentinel=True):
         self.host = host
         self.port = port
         self.password = password
+        self.use_sentinel = use_sentinel
         self.socket = None
         self.request_id = 0
+        self._framer = RconFramer()
+        self._packets = iter(())
 
     def connect(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.connect((self.host, self.port))
+        self._framer = RconFramer()
+        self._packets = iter(())
 
         # Autentica
-        self._send_packet(3, self.password)
+        self._send_packet(SERVERDATA_AUTH, self.password)
         response = self._receive_packet()
         if response is None:
             raise Exception('Nenhuma resposta do servidor RCON durante a autenticação')
@@ -25,42 +102,49 @@ class FactorioRCON:
 
     def _send_packet(self, packet_type, body):
         self.request_id += 1
-        body_bytes = body.encode('utf-8') + b'\x00\x00'
-        size = len(body_bytes) + 8
-        packet = struct.pack('<i', size)
-        packet += struct.pack('<i', self.request_id)
-        packet += struct.pack('<i', packet_type)
-        packet += body_bytes
-        self.socket.sendall(packet)
+        self.socket.sendall(_pack_packet(self.request_id, packet_type, body))
         return self.request_id
 
     def _receive_packet(self):
-        size_data = self._recv_all(4)
-        if not size_data:
-            return None
-        size = struct.unpack('<i', size_data)[0]
-        data = self._recv_all(size)
-        if not data or len(data) < 8:
-            return None
-        request_id = struct.unpack('<i', data[0:4])[0]
-        packet_type = struct.unpack('<i', data[4:8])[0]
-        # body ends with two null bytes
-        body = data[8:-2].decode('utf-8', errors='ignore')
-        return (request_id, packet_type, body)
-
-    def _recv_all(self, n):
-        data = b''
-        while len(data) < n:
-            chunk = self.socket.recv(n - len(data))
-            if not chunk:
-                break
-            data += chunk
-        return data
+        while True:
+            packet = next(self._packets, None)
+            if packet is not None:
+                return packet
+            n = self.socket.recv_into(self._framer.write_view())
+            if not n:
+                return None
+            self._framer.commit(n)
+            self._packets = self._framer.packets()
 
     def command(self, cmd):
-        self._send_packet(2, cmd)
-        resp = self._receive_packet()
-        return resp[2] if resp else ''
+        request_id = self.request_id + 1
+        if not self.use_sentinel:
+            self._send_packet(SERVERDATA_EXECCOMMAND, cmd)
+            while True:
+                resp = self._receive_packet()
+                if resp is None or resp[0] == request_id:
+                    return resp[2] if resp else ''
+
+        # Envia o comando seguido de um pacote vazio (sentinela): o servidor
+        # responde na ordem, então a resposta do sentinela marca o fim de uma
+        # resposta dividida em vários pacotes.
+        self.request_id += 2
+        sentinel_id = self.request_id
+        self.socket.sendall(
+            _pack_packet(request_id, SERVERDATA_EXECCOMMAND, cmd)
+            + _pack_packet(sentinel_id, SERVERDATA_RESPONSE_VALUE, '')
+        )
+        parts = []
+        while True:
+            resp = self._receive_packet()
+            if resp is None:
+                break
+            if resp[0] == request_id:
+                parts.append(resp[2])
+            elif resp[0] == sentinel_id:
+                break
+            # outros ids: restos de comandos anteriores (ex.: eco extra do sentinela)
+        return ''.join(parts)
 
     def send_monika_message(self, message):
         # Use the mod's command name `/monika_msg` (o mod usa este comando)
@@ -72,3 +156,197 @@ class FactorioRCON:
                 self.socket.close()
             except Exception:
                 pass
+
+
+class _RconProtocol(asyncio.BufferedProtocol):
+    """Protocolo asyncio que lê direto no `RconFramer` (equivalente a `recv_into`)."""
+
+    def __init__(self, client):
+        self._client = client
+        self._framer = RconFramer()
+        self._paused = False
+        self._drain_waiters = []
+
+    def get_buffer(self, sizehint):
+        return self._framer.write_view()
+
+    def buffer_updated(self, nbytes):
+        self._framer.commit(nbytes)
+        try:
+            for packet in self._framer.packets():
+                self._client._dispatch(packet)
+        except ConnectionError as exc:
+            self._client._transport.abort()
+            self._client._connection_lost(exc)
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def drain(self):
+        if self._paused:
+            waiter = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+    def connection_lost(self, exc):
+        self.resume_writing()
+        self._client._connection_lost(exc)
+
+
+class AsyncFactorioRCON:
+    """Versão asyncio e pipelined de `FactorioRCON`.
+
+    Cada comando recebe um `request_id` próprio e uma entrada na tabela de
+    pendentes; o protocolo de leitura entrega cada pacote à entrada do seu id.
+    Assim várias tarefas (chat, respostas, telemetria) compartilham o mesmo
+    socket com vários comandos em voo, sem esperar um round trip por chamada.
+    Respostas divididas em vários pacotes são remontadas até a chegada do
+    sentinela enviado logo após o comando.
+    """
+
+    MAX_REQUEST_ID = 0x7FFFFFFF
+
+    def __init__(self, host='localhost', port=27015, password='', use_sentinel=True):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.use_sentinel = use_sentinel
+        self.request_id = 0
+        self._transport = None
+        self._protocol = None
+        self._write_lock = None
+        self._pending = {}
+        self._sentinels = {}
+        self._closed = True
+        self._closed_event = None
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        self._transport, self._protocol = await loop.create_connection(
+            lambda: _RconProtocol(self), self.host, self.port
+        )
+        self._write_lock = asyncio.Lock()
+        self._closed_event = asyncio.Event()
+        self._closed = False
+        sock = self._transport.get_extra_info('socket')
+        if sock is not None:
+            # keepalive do TCP detecta conexões mortas mesmo sem tráfego
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        # Autentica (a resposta de falha vem com id -1, tratada em `_dispatch`)
+        auth = loop.create_future()
+        request_id = self._next_request_id()
+        self._pending[request_id] = (auth, None)
+        self._pending[-1] = (auth, None)
+        try:
+            self._transport.write(_pack_packet(request_id, SERVERDATA_AUTH, self.password))
+            response = await auth
+        except ConnectionError:
+            raise Exception('Nenhuma resposta do servidor RCON durante a autenticação')
+        finally:
+            self._pending.pop(request_id, None)
+            self._pending.pop(-1, None)
+        if response is None:
+            await self.close()
+            raise Exception('Falha na autenticação RCON')
+
+    def _next_request_id(self):
+        self.request_id = self.request_id + 1 if self.request_id < self.MAX_REQUEST_ID else 1
+        return self.request_id
+
+    def _dispatch(self, packet):
+        request_id, packet_type, body = packet
+        if request_id == -1 and -1 in self._pending:
+            future, _ = self._pending[-1]
+            if not future.done():
+                future.set_result(None)
+            return
+        owner = self._sentinels.pop(request_id, None)
+        if owner is not None:
+            entry = self._pending.pop(owner, None)
+            if entry is not None and not entry[0].done():
+                entry[0].set_result(''.join(entry[1]))
+            return
+        entry = self._pending.get(request_id)
+        # respostas de comandos já cancelados (deadline) são descartadas
+        if entry is None or entry[0].done():
+            return
+        future, parts = entry
+        if parts is None:
+            self._pending.pop(request_id, None)
+            future.set_result(body)
+        else:
+            parts.append(body)
+
+    def _connection_lost(self, error=None):
+        self._closed = True
+        self._fail_pending(error)
+        if self._closed_event is not None:
+            self._closed_event.set()
+
+    async def wait_closed(self):
+        """Retorna quando a conexão cair ou for fechada."""
+        if self._closed_event is None:
+            return
+        await self._closed_event.wait()
+
+    def _fail_pending(self, error=None):
+        pending, self._pending = self._pending, {}
+        self._sentinels = {}
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f'Conexão RCON encerrada: {error or "EOF"}'))
+
+    async def command(self, cmd):
+        if self._closed:
+            raise ConnectionError('Conexão RCON fechada')
+        future = asyncio.get_running_loop().create_future()
+        request_id = self._next_request_id()
+        packet = _pack_packet(request_id, SERVERDATA_EXECCOMMAND, cmd)
+        sentinel_id = None
+        if self.use_sentinel:
+            sentinel_id = self._next_request_id()
+            packet += _pack_packet(sentinel_id, SERVERDATA_RESPONSE_VALUE, '')
+            self._sentinels[sentinel_id] = request_id
+            self._pending[request_id] = (future, [])
+        else:
+            self._pending[request_id] = (future, None)
+        try:
+            async with self._write_lock:
+                self._transport.write(packet)
+                await self._protocol.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+            if sentinel_id is not None:
+                self._sentinels.pop(sentinel_id, None)
+
+    async def send_monika_message(self, message):
+        return await self.command(f"/monika_msg {message}")
+
+    async def close(self):
+        self._closed = True
+        self._fail_pending()
+        if self._closed_event is not None:
+            self._closed_event.set()
+        if self._transport is not None:
+            try:
+                self._transport.close()
+            except Exception:
+                pass
+            self._transport = None
@@ -0,0 +1,145 @@
+"""Pool de conexões RCON autenticadas com health check e deadline por comando."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional
+
+from IA.rcon_client import AsyncFactorioRCON
+
+
+class RCONPool:
+    """Mantém `size` conexões `AsyncFactorioRCON` prontas para uso.
+
+    Cada conexão tem uma task de manutenção que conecta/autentica com backoff,
+    envia probes periódicos e, quando a conexão cai, a substitui em segundo
+    plano. Os comandos usam a conexão saudável menos ocupada e respeitam um
+    deadline: uma falha em um socket não trava as respostas por um ciclo
+    inteiro de backoff, pois as outras conexões continuam atendendo.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        size: int = 2,
+        command_timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        probe_interval: float = 15.0,
+        probe_command: str = "/version",
+        max_backoff: float = 60.0,
+        use_sentinel: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = max(1, size)
+        self.command_timeout = command_timeout
+        self.connect_timeout = connect_timeout
+        self.probe_interval = probe_interval
+        self.probe_command = probe_command
+        self.max_backoff = max_backoff
+        self.use_sentinel = use_sentinel
+        self._slots: List[Optional[AsyncFactorioRCON]] = [None] * self.size
+        self._tasks: List[asyncio.Task] = []
+        self._ready: Optional[asyncio.Event] = None
+        self._closing = False
+
+    @property
+    def healthy(self) -> int:
+        return sum(1 for conn in self._slots if conn is not None and not conn.closed)
+
+    async def start(self) -> None:
+        self._ready = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._maintain(slot)) for slot in range(self.size)]
+
+    async def _connect(self) -> AsyncFactorioRCON:
+        conn = AsyncFactorioRCON(self.host, self.port, self.password, use_sentinel=self.use_sentinel)
+        try:
+            await asyncio.wait_for(conn.connect(), self.connect_timeout)
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    async def _maintain(self, slot: int) -> None:
+        backoff = 1.0
+        while not self._closing:
+            try:
+                conn = await self._connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[rcon_pool] ERROR connecting slot {slot} to {self.host}:{self.port}: {exc!r}; retrying in {backoff:g}s")
+                await asyncio.sleep(backoff)
+                backoff = min(self.max_backoff, backoff * 2)
+                continue
+
+            backoff = 1.0
+            self._slots[slot] = conn
+            self._ready.set()
+            print(f"[rcon_pool] slot {slot} connected ({self.healthy}/{self.size} healthy)")
+            try:
+                await self._watch(conn)
+            finally:
+                self._slots[slot] = None
+                await conn.close()
+            if not self._closing:
+                print(f"[rcon_pool] slot {slot} lost; replacing in background ({self.healthy}/{self.size} healthy)")
+
+    async def _watch(self, conn: AsyncFactorioRCON) -> None:
+        """Espera a conexão cair, enviando um probe a cada `probe_interval` segundos."""
+        while not conn.closed:
+            try:
+                await asyncio.wait_for(conn.wait_closed(), self.probe_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(conn.command(self.probe_command), self.command_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[rcon_pool] probe failed: {exc!r}")
+                return
+
+    async def _acquire(self, deadline: float) -> AsyncFactorioRCON:
+        loop = asyncio.get_running_loop()
+        while True:
+            healthy = [conn for conn in self._slots if conn is not None and not conn.closed]
+            if healthy:
+                return min(healthy, key=lambda conn: conn.in_flight)
+            self._ready.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("nenhuma conexão RCON disponível")
+            await asyncio.wait_for(self._ready.wait(), remaining)
+
+    async def command(self, cmd: str, timeout: Optional[float] = None) -> str:
+        """Executa `cmd` numa conexão saudável; levanta `asyncio.TimeoutError` após o deadline."""
+        if self._closing:
+            raise ConnectionError("pool RCON fechado")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.command_timeout if timeout is None else timeout)
+        conn = await self._acquire(deadline)
+        try:
+            return await asyncio.wait_for(conn.command(cmd), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            # socket travado: fecha para a task de manutenção repor a conexão
+            await conn.close()
+            raise
+
+    async def send_monika_message(self, message: str, timeout: Optional[float] = None) -> str:
+        return await self.command(f"/monika_msg {message}", timeout=timeout)
+
+    async def close(self) -> None:
+        self._closing = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for conn in self._slots:
+            if conn is not None:
+                await conn.close()
+        self._slots = [None] * self.size
@@ -0,0 +1,243 @@
+"""Grafo de receitas dos itens: custo em matéria-prima e máquinas para uma taxa.
+
+As contas ("quantas montadoras para 1/s", "quanto minério custa") saem
+daqui prontas em vez de ficarem para o modelo. O grafo é montado a partir
+da base de itens (`recipe` estruturada do `item_data.json` ou o
+`recipe_text` da wiki) e, na construção, calcula uma única matriz `T` em
+que `T[i, j]` é quanto do item `j` entra (direta ou indiretamente) numa
+unidade do item `i`. Os itens são processados em ordem topológica, um nível
+de profundidade por vez (uma multiplicação de matriz por nível), então cada
+linha só depende de linhas já prontas. Depois disso, custo bruto e taxas de
+toda a cadeia são uma linha de `T` vezes a taxa pedida.
+
+Receitas em ciclo (ex.: enriquecimento de urânio) não entram: o item vira
+matéria-prima para o grafo.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# velocidade de fabricação das máquinas (o tempo da receita é dividido por ela)
+CRAFTING_SPEEDS: Dict[str, float] = {
+    "assembling-machine-1": 0.5,
+    "assembling-machine-2": 0.75,
+    "assembling-machine-3": 1.25,
+    "stone-furnace": 1.0,
+    "steel-furnace": 2.0,
+    "electric-furnace": 2.0,
+    "chemical-plant": 1.0,
+    "oil-refinery": 1.0,
+    "centrifuge": 1.0,
+    "foundry": 4.0,
+    "electromagnetic-plant": 2.0,
+    "cryogenic-plant": 2.0,
+    "biochamber": 2.0,
+}
+MAX_CHAIN_LINES = 12
+
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_TERM = re.compile(rf"^\s*(?:({_NUMBER})\s*)?(.*?)\s*$")
+# "2/s", "60 por minuto", "2 [item=gear] por segundo", "3 engrenagens/s"
+_RATE = re.compile(
+    rf"({_NUMBER})\s*(?:(?:\[[^\]]*\]|[^\W\d]+)\s*)?(?:/|por|per|p/|a cada|every)\s*"
+    r"(s|seg|segs|segundo|sec|second|min|minuto|minute)\b",
+    re.IGNORECASE,
+)
+
+
+class Recipe(NamedTuple):
+    time: float
+    ingredients: Dict[str, float]
+    amount: float
+    machines: Tuple[str, ...]
+
+
+def to_slug(name: str) -> str:
+    return " ".join(str(name).split()).lower().replace(" ", "-")
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def parse_recipe_text(slug: str, text: str) -> Optional[Tuple[float, Dict[str, float], float]]:
+    """`"0,5 Time + 2 Iron plate → 1 Iron gear wheel"` -> (tempo, ingredientes, quantidade feita).
+
+    Devolve None para o que não der para ler sem ambiguidade (várias
+    receitas, vários produtos sem o próprio item).
+    """
+    if not text or text.count("→") != 1:
+        return None
+    left, right = text.split("→")
+    time = None
+    ingredients: Dict[str, float] = {}
+    for term in left.split(" + "):
+        match = _TERM.match(term)
+        amount, name = match.group(1), match.group(2)
+        if not name or name.lower() == "time":
+            if amount is None:
+                return None
+            time = _number(amount)
+            continue
+        name = to_slug(name)
+        ingredients[name] = ingredients.get(name, 0.0) + (_number(amount) if amount else 1.0)
+    produced = None
+    for term in right.split(" + "):
+        match = _TERM.match(term)
+        if to_slug(match.group(2)) == slug:
+            produced = _number(match.group(1)) if match.group(1) else 1.0
+    if time is None or not ingredients or produced is None:
+        return None
+    return time, ingredients, produced
+
+
+def recipe_from_payload(slug: str, payload: dict) -> Optional[Recipe]:
+    """Receita do item a partir da base; sem tempo conhecido é None e a pergunta vai para o modelo."""
+    machines = tuple(to_slug(name) for name in payload.get("produced_by") or ())
+    recipe = payload.get("recipe")
+    if isinstance(recipe, dict) and recipe.get("ingredients") and recipe.get("time") is not None:
+        ingredients = {to_slug(name): float(amount) for name, amount in recipe["ingredients"].items()}
+        amount = float(recipe.get("result_count") or recipe.get("amount") or 1)
+        return Recipe(float(recipe["time"]), ingredients, amount, machines)
+    # sem tempo na receita estruturada, o texto da wiki ainda pode trazê-lo
+    parsed = parse_recipe_text(slug, payload.get("recipe_text") or "")
+    if parsed is None:
+        return None
+    return Recipe(parsed[0], parsed[1], parsed[2], machines)
+
+
+def parse_rate(text: str) -> Optional[float]:
+    """Taxa pedida no texto, em itens por segundo ("2/s", "60 por minuto")."""
+    match = _RATE.search(text or "")
+    if not match:
+        return None
+    rate = _number(match.group(1))
+    return rate / 60.0 if match.group(2).lower().startswith("m") else rate
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.3g}" if value < 1000 else f"{value:,.0f}"
+
+
+class RecipeGraph:
+    """Receitas por slug com a matriz de necessidades totais pré-calculada."""
+
+    def __init__(self, recipes: Dict[str, Recipe]):
+        self.order, self.cyclic = self._order(recipes)
+        self.recipes = {slug: recipes[slug] for slug in self.order}
+        nodes = set(self.recipes)
+        for recipe in self.recipes.values():
+            nodes.update(recipe.ingredients)
+        self.slugs: List[str] = sorted(nodes)
+        self.index = {slug: position for position, slug in enumerate(self.slugs)}
+        self.raw = np.array([slug not in self.recipes for slug in self.slugs], dtype=bool)
+        self.totals = self._solve()
+        self.describe = lru_cache(maxsize=512)(self._describe)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[str, dict]]) -> "RecipeGraph":
+        recipes = {}
+        for slug, payload in items:
+            recipe = recipe_from_payload(slug, payload)
+            if recipe is not None and slug not in recipe.ingredients:
+                recipes[slug] = recipe
+        return cls(recipes)
+
+    @staticmethod
+    def _order(recipes: Dict[str, Recipe]) -> Tuple[List[str], List[str]]:
+        """Ordem topológica (Kahn); o que sobra com dependências pendentes está num ciclo (ou depende de um)."""
+        waiting = {slug: {name for name in recipe.ingredients if name in recipes} for slug, recipe in recipes.items()}
+        users = defaultdict(list)
+        for slug, needs in waiting.items():
+            for name in needs:
+                users[name].append(slug)
+        ready = sorted(slug for slug, needs in waiting.items() if not needs)
+        order: List[str] = []
+        while ready:
+            slug = ready.pop()
+            order.append(slug)
+            for user in users[slug]:
+                waiting[user].discard(slug)
+                if not waiting[user]:
+                    ready.append(user)
+        cyclic = sorted(set(recipes) - set(order))
+        if cyclic:
+            print(f"[recipe_graph] {len(cyclic)} recipes in cycles treated as raw: {', '.join(cyclic[:5])}")
+        return order, cyclic
+
+    def _solve(self) -> np.ndarray:
+        size = len(self.slugs)
+        # direct[i, j]: quanto de j vai numa unidade de i
+        direct = np.zeros((size, size), dtype=np.float64)
+        depth = np.zeros(size, dtype=np.int64)
+        for slug in self.order:
+            row = self.index[slug]
+            recipe = self.recipes[slug]
+            columns = [self.index[name] for name in recipe.ingredients]
+            direct[row, columns] = [amount / recipe.amount for amount in recipe.ingredients.values()]
+            depth[row] = 1 + max(depth[column] for column in columns)
+
+        totals = np.eye(size, dtype=np.float64)
+        for level in range(1, int(depth.max(initial=0)) + 1):
+            rows = np.flatnonzero(depth == level)
+            # só as colunas usadas por este nível (todas de níveis já resolvidos)
+            used = np.flatnonzero(direct[rows].any(axis=0))
+            totals[rows] += direct[np.ix_(rows, used)] @ totals[used]
+        return totals
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self.recipes
+
+    def requirements(self, slug: str, rate: float = 1.0) -> Dict[str, float]:
+        """Quantidade (ou taxa) de cada item da cadeia para `rate` de `slug`, incluindo ele."""
+        row = self.totals[self.index[slug]] * rate
+        return {self.slugs[column]: float(row[column]) for column in np.flatnonzero(row)}
+
+    def raw_cost(self, slug: str, amount: float = 1.0) -> Dict[str, float]:
+        row = self.totals[self.index[slug]] * amount
+        columns = np.flatnonzero((row > 0) & self.raw)
+        return {self.slugs[column]: float(row[column]) for column in columns}
+
+    def machines(self, slug: str, rate: float) -> Dict[str, float]:
+        """Número de máquinas (fracionário) de cada tipo conhecido que fabrica `slug` a `rate`/s."""
+        recipe = self.recipes[slug]
+        work = rate * recipe.time / recipe.amount
+        return {machine: work / CRAFTING_SPEEDS[machine] for machine in recipe.machines if machine in CRAFTING_SPEEDS}
+
+    def _describe(self, slug: str, rate: Optional[float] = None) -> Optional[str]:
+        if slug not in self.recipes:
+            return None
+        raw = self.raw_cost(slug)
+        needs = self.requirements(slug)
+        craft_time = sum(
+            amount * self.recipes[name].time / self.recipes[name].amount
+            for name, amount in needs.items()
+            if name in self.recipes
+        )
+        lines = [
+            f"{slug}: matéria-prima por unidade = "
+            + ", ".join(f"{_fmt(amount)} {name}" for name, amount in sorted(raw.items()))
+            + f"; tempo total de fabricação {_fmt(craft_time)}s (velocidade 1)"
+        ]
+        if rate:
+            lines.append(f"{slug} a {_fmt(rate)}/s:")
+            # o próprio item primeiro, depois a cadeia do maior volume para o menor
+            chain = sorted(
+                (name for name in needs if name in self.recipes), key=lambda name: (name != slug, -needs[name], name)
+            )
+            for name in chain[:MAX_CHAIN_LINES]:
+                machines = self.machines(name, needs[name] * rate)
+                counts = ", ".join(
+                    f"{math.ceil(count - 1e-9)} {machine} ({_fmt(count)})" for machine, count in machines.items()
+                )
+                lines.append(f"- {name} {_fmt(needs[name] * rate)}/s" + (f": {counts}" if counts else ""))
+            inputs = ", ".join(f"{_fmt(amount * rate)}/s {name}" for name, amount in sorted(raw.items()))
+            lines.append(f"- entrada bruta: {inputs}")
+        return "\n".join(lines)
@@ -0,0 +1,181 @@
+"""Cache de respostas na frente do `ollama.chat`: match exato e por similaridade."""
+
+from __future__ import annotations
+
+import inspect
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from IA.embeddings import dot
+from IA.item_context import ITEM_TAG, find_item_slugs
+
+_NON_WORD = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+# sinais de que a pergunta continua a conversa anterior ("e o outro?", "quanto custa isso?"):
+# a resposta depende do histórico de quem perguntou e não serve para mais ninguém
+_FOLLOW_UP = re.compile(
+    r"^(e|mas|entao|então|and|but|so|also)\b"
+    r"|\b(isso|isto|disso|nisso|desse|dessa|deste|desta|nesse|nessa|esse|essa|esses|essas|este|estes|estas"
+    r"|ele|ela|eles|elas|dele|dela|deles|delas|outro|outra|outros|outras|mesmo|mesma|anterior"
+    r"|it|its|this|that|these|those|they|them|other|same|previous)\b",
+    re.UNICODE,
+)
+
+
+def normalize_question(text: str) -> str:
+    """Minúsculas, sem pontuação nem tags de item, espaços colapsados."""
+    text = ITEM_TAG.sub(" ", text.lower())
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def is_self_contained(normalized: str, slugs: Sequence[str]) -> bool:
+    """Se a pergunta se entende sozinha: cita algum item e não retoma a conversa anterior.
+
+    Só essas entram no cache; a chave não tem jogador nem histórico, então
+    "e quanto custa isso?" de um jogador não pode virar a resposta de outro.
+    """
+    return bool(slugs) and not _FOLLOW_UP.search(normalized)
+
+
+class CacheProbe(NamedTuple):
+    key: str
+    slugs: Tuple[str, ...]
+    text: str
+    vector: Optional[List[float]] = None
+
+
+class _Entry:
+    __slots__ = ("response", "expires_at", "slugs", "vector")
+
+    def __init__(self, response: str, expires_at: float, slugs: Tuple[str, ...], vector):
+        self.response = response
+        self.expires_at = expires_at
+        self.slugs = slugs
+        self.vector = vector
+
+
+class ResponseCache:
+    """Respostas já geradas, indexadas pela pergunta normalizada + itens citados.
+
+    Itens citados são os de `[item=...]` e os citados pelo nome ("placa de
+    aço"), os mesmos que entram no contexto (`find_item_slugs`). Só
+    perguntas que se entendem sozinhas são cacheadas (`is_self_contained`).
+    Nível exato: chave = pergunta normalizada + slugs dos itens citados.
+    Nível semântico: vizinho mais próximo (cosseno) entre as entradas com os
+    mesmos slugs, aceito acima de `threshold`. Os dois níveis compartilham o
+    LRU (`max_entries`) e o TTL; `stats()` expõe acertos e falhas.
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        max_entries: int = 512,
+        ttl: float = 24 * 3600,
+        threshold: float = 0.92,
+        min_chars: int = 8,
+    ):
+        self.embedder = embedder
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.embed_errors = 0
+        self.skipped = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "skipped": self.skipped,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        if self.embedder is None:
+            return None
+        try:
+            result = self.embedder.embed([text])
+            if inspect.isawaitable(result):
+                result = await result
+            return result[0]
+        except Exception as exc:
+            # sem embeddings o cache segue só com o nível exato
+            self.embed_errors += 1
+            if self.embed_errors == 1:
+                print(f"[response_cache] ERROR embedding prompt (semantic tier disabled for this call): {exc!r}")
+            return None
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+            if entry.expires_at > now:
+                self.evictions += 1
+        # entradas expiradas no meio do LRU saem quando forem consultadas
+
+    async def lookup(
+        self, text: str, slugs: Optional[Sequence[str]] = None
+    ) -> Tuple[Optional[str], Optional[CacheProbe]]:
+        """Devolve (resposta ou None, probe para `store`); probe None = pergunta não cacheável.
+
+        `slugs` são os itens citados já calculados por quem chama (a primeira
+        chamada de `find_item_slugs` monta o reconhecedor a partir da base,
+        então o ideal é fazê-la fora do event loop); None calcula aqui.
+        """
+        normalized = normalize_question(text)
+        if len(normalized) < self.min_chars:
+            return None, None
+        slugs = tuple(sorted(set(find_item_slugs(text) if slugs is None else slugs)))
+        if not is_self_contained(normalized, slugs):
+            # depende do histórico de quem perguntou: nem consulta nem grava
+            self.skipped += 1
+            return None, None
+        key = f"{normalized}|{','.join(slugs)}"
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.response, CacheProbe(key, slugs, normalized, entry.vector)
+            del self._entries[key]
+
+        vector = await self._embed(normalized)
+        if vector is not None:
+            best_key, best_score = None, self.threshold
+            for other_key, other in self._entries.items():
+                if other.vector is None or other.slugs != slugs or other.expires_at <= now:
+                    continue
+                score = dot(vector, other.vector)
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                return self._entries[best_key].response, CacheProbe(key, slugs, normalized, vector)
+
+        self.misses += 1
+        return None, CacheProbe(key, slugs, normalized, vector)
+
+    def store(self, probe: Optional[CacheProbe], response: str) -> None:
+        if probe is None or not response:
+            return
+        now = time.monotonic()
+        self._entries[probe.key] = _Entry(response, now + self.ttl, probe.slugs, probe.vector)
+        self._entries.move_to_end(probe.key)
+        self._expire(now)
@@ -0,0 +1,105 @@
+"""Sessões de conversa por jogador com LRU limitado em bytes sobre o `MemoryStore`."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from IA.memory_store import MemoryStore
+
+
+def _entry_size(entry: Dict[str, object]) -> int:
+    return sum(len(str(entry.get(key) or "").encode("utf-8")) for key in ("prompt", "response"))
+
+
+class _Session:
+    __slots__ = ("turns", "size")
+
+    def __init__(self, turns: List[Dict[str, object]], max_turns: int):
+        self.turns: Deque[Dict[str, object]] = deque(maxlen=max_turns)
+        self.size = 0
+        for entry in turns:
+            self.push(entry)
+
+    def push(self, entry: Dict[str, object]) -> int:
+        """Adiciona um turno e devolve a variação de tamanho da sessão."""
+        before = self.size
+        if len(self.turns) == self.turns.maxlen:
+            self.size -= _entry_size(self.turns[0])
+        self.turns.append(entry)
+        self.size += _entry_size(entry)
+        return self.size - before
+
+
+class SessionCache:
+    """Histórico de cada jogador, com as sessões ativas quentes em memória.
+
+    As sessões usadas recentemente ficam num LRU cujo total é limitado por
+    `max_bytes`; ao passar do limite, as menos recentes são descartadas da
+    memória (continuam no disco) e voltam a ser lidas do `MemoryStore` pelo
+    índice `player, id` quando o jogador falar de novo.
+    """
+
+    def __init__(self, store: MemoryStore, max_turns: int = 200, max_bytes: int = 8 * 1024 * 1024):
+        self.store = store
+        self.max_turns = max(1, max_turns)
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self._bytes > self.max_bytes and len(self._sessions) > (1 if keep else 0):
+            player, session = next(iter(self._sessions.items()))
+            if player == keep:
+                self._sessions.move_to_end(player)
+                continue
+            del self._sessions[player]
+            self._bytes -= session.size
+            self.evictions += 1
+
+    def _session(self, player: str) -> _Session:
+        session = self._sessions.get(player)
+        if session is not None:
+            self.hits += 1
+            self._sessions.move_to_end(player)
+            return session
+        self.misses += 1
+        session = _Session(self.store.last_for_player(player, self.max_turns), self.max_turns)
+        self._sessions[player] = session
+        self._bytes += session.size
+        self._evict(keep=player)
+        return session
+
+    def history(self, player: Optional[str], n: Optional[int] = None) -> List[Dict[str, object]]:
+        """Últimos `n` turnos do jogador; sem jogador, cai no histórico global."""
+        n = self.max_turns if n is None else min(n, self.max_turns)
+        if not player:
+            return self.store.last(n)
+        with self._lock:
+            turns = list(self._session(player).turns)
+        return turns[-n:] if n > 0 else []
+
+    def append(
+        self, player: Optional[str], prompt: str, response: str, timestamp: Optional[str] = None
+    ) -> Dict[str, object]:
+        entry = self.store.append(prompt, response, timestamp=timestamp, player=player)
+        if player:
+            with self._lock:
+                session = self._sessions.get(player)
+                # sessão fria: o turno já está no disco e será lido quando ela voltar
+                if session is not None:
+                    self._bytes += session.push(entry)
+                    self._evict(keep=player)
+        return entry
@@ -0,0 +1,46 @@
+"""Quebra a resposta em streaming do modelo em frases para enviar ao jogo aos poucos."""
+
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+
+# fim de frase: pontuação seguida de espaço (não quebra '0.5' nem '[item=x]') ou quebra de linha
+SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+|\n+")
+
+
+class SentenceSplitter:
+    """Acumula tokens e devolve frases completas assim que o limite da frase chega.
+
+    Frases curtas demais (`min_chars`) são juntadas com a seguinte para não
+    inundar o chat, e trechos sem pontuação maiores que `max_chars` são
+    cortados no último espaço, então respostas longas saem inteiras em partes.
+    """
+
+    def __init__(self, min_chars: int = 24, max_chars: int = 400):
+        self.min_chars = min_chars
+        self.max_chars = max(min_chars + 1, max_chars)
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        chunks: List[str] = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            chunks.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        while len(self._buffer) > self.max_chars:
+            cut = self._buffer.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            chunks.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:].lstrip()
+        return [chunk for chunk in chunks if chunk]
+
+    def flush(self) -> Optional[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
@@ -0,0 +1,124 @@
+"""Compactação em segundo plano do histórico antigo em resumos (digests)."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+from typing import Callable, Dict, List, Optional
+
+from IA.memory_store import MemoryStore
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Você resume conversas entre jogadores de Factorio e a assistente Monika."
+    " Escreva em português, em no máximo {max_sentences} frases curtas, só os fatos úteis"
+    " para continuar a conversa: objetivos do jogador, itens/tecnologias discutidos,"
+    " decisões tomadas e dúvidas em aberto. Não invente nada."
+)
+
+
+def format_transcript(turns: List[Dict[str, object]]) -> str:
+    lines = []
+    for entry in turns:
+        if entry.get("prompt"):
+            lines.append(f"Jogador: {entry['prompt']}")
+        if entry.get("response"):
+            lines.append(f"Monika: {entry['response']}")
+    return "\n".join(lines)
+
+
+class OllamaSummarizer:
+    """Resume um bloco de turnos pelo `LLMDispatcher`, como geração de segundo plano.
+
+    Passa pelos mesmos semáforos das respostas do chat, um resumo por vez e
+    só com os backends livres, para não disputar a GPU com os jogadores.
+    `model` None usa o modelo de cada backend.
+    """
+
+    def __init__(self, dispatcher, model: Optional[str] = None, max_sentences: int = 5):
+        self.dispatcher = dispatcher
+        self.model = model
+        self.max_sentences = max_sentences
+
+    async def __call__(self, turns: List[Dict[str, object]]) -> str:
+        messages = [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT.format(max_sentences=self.max_sentences)},
+            {"role": "user", "content": format_transcript(turns)},
+        ]
+        result = await self.dispatcher.complete(messages, model=self.model, background=True)
+        return result.strip()
+
+
+class HistoryCompactor:
+    """Transforma os turnos antigos de cada jogador em resumos guardados no `MemoryStore`.
+
+    Os `keep_recent` turnos mais novos continuam crus; acima disso, cada bloco
+    de `batch_size` turnos vira um resumo. `summarize` é qualquer callable
+    (síncrono ou assíncrono) que recebe a lista de turnos e devolve o texto.
+    Cada rodada cria no máximo `max_per_run` resumos; o resto (ex.: o
+    histórico inteiro na primeira execução) fica para as rodadas seguintes.
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        summarize: Callable,
+        keep_recent: int = 20,
+        batch_size: int = 40,
+        interval: float = 300.0,
+        max_per_run: int = 8,
+    ):
+        self.store = store
+        self.summarize = summarize
+        self.keep_recent = max(0, keep_recent)
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.max_per_run = max(1, max_per_run)
+
+    async def _blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    async def _summarize(self, turns: List[Dict[str, object]]) -> str:
+        result = self.summarize(turns)
+        if inspect.isawaitable(result):
+            result = await result
+        return str(result or "").strip()
+
+    async def compact_player(self, player: Optional[str], limit: Optional[int] = None) -> int:
+        """Resume até `limit` blocos pendentes de um jogador; devolve quantos resumos criou."""
+        created = 0
+        while limit is None or created < limit:
+            pending = await self._blocking(self.store.undigested, player, self.batch_size + self.keep_recent)
+            if len(pending) < self.batch_size + self.keep_recent:
+                return created
+            chunk = pending[: self.batch_size]
+            summary = await self._summarize(chunk)
+            if not summary:
+                return created
+            await self._blocking(self.store.add_digest, player, chunk[0]["id"], chunk[-1]["id"], summary)
+            created += 1
+        return created
+
+    async def compact_all(self) -> int:
+        counts = await self._blocking(self.store.pending_digest_counts)
+        created = 0
+        for player, count in counts.items():
+            if created >= self.max_per_run:
+                break
+            if count >= self.batch_size + self.keep_recent:
+                created += await self.compact_player(player, self.max_per_run - created)
+        return created
+
+    async def run(self) -> None:
+        """Loop da task de segundo plano."""
+        while True:
+            try:
+                created = await self.compact_all()
+                if created:
+                    print(f"[summarizer] created {created} digests")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[summarizer] ERROR compacting history: {exc!r}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,270 @@
+"""Índice vetorial do histórico de conversas: matriz NumPy em `.npy` mapeado em memória.
+
+Cada interação salva vira um vetor normalizado (embedding de prompt +
+resposta). A busca é um único produto matriz·vetor sobre todas as linhas e
+um `argpartition` para o top-k, então escolher o contexto por relevância leva
+milissegundos mesmo com 100 mil interações guardadas.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from IA.memory_store import MemoryStore
+
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.npy"
+OWNERS_FILE = "owners.npy"
+META_FILE = "meta.json"
+# limite do texto de cada interação enviado ao embedder
+MAX_EMBED_CHARS = 2000
+
+
+def owner_key(player: Optional[str]) -> int:
+    """Identificador int64 estável do jogador (0 = sem jogador)."""
+    if not player:
+        return 0
+    digest = hashlib.blake2b(player.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True) or 1
+
+
+def entry_text(entry: Dict[str, object]) -> str:
+    text = f"{entry.get('prompt') or ''}\n{entry.get('response') or ''}".strip()
+    return text[:MAX_EMBED_CHARS]
+
+
+class VectorIndex:
+    """Vetores normalizados (float32) + ids e donos, persistidos como `.npy` em `directory`.
+
+    Os arquivos são abertos com `np.load(mmap_mode="r+")`: só as páginas
+    tocadas vão para a RAM e um `add` grava direto no arquivo. A capacidade
+    dobra quando enche; `meta.json` guarda quantas linhas são válidas.
+    """
+
+    def __init__(self, directory: str, initial_capacity: int = 1024):
+        self.directory = directory
+        self.initial_capacity = max(1, initial_capacity)
+        self._lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self.count = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._owners: Optional[np.ndarray] = None
+        os.makedirs(directory, exist_ok=True)
+        try:
+            self._load()
+        except Exception as exc:
+            print(f"[vector_index] ERROR loading {directory} (rebuilding): {exc!r}")
+            self.reset()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path(META_FILE)):
+            return
+        with open(self._path(META_FILE), "r", encoding="utf-8") as handler:
+            meta = json.load(handler)
+        vectors = np.load(self._path(VECTORS_FILE), mmap_mode="r+")
+        ids = np.load(self._path(IDS_FILE), mmap_mode="r+")
+        owners = np.load(self._path(OWNERS_FILE), mmap_mode="r+")
+        count, dim = int(meta["count"]), int(meta["dim"])
+        if vectors.shape[1] != dim or not (count <= len(vectors) == len(ids) == len(owners)):
+            raise ValueError(f"inconsistent index files (count={count}, shape={vectors.shape})")
+        self._vectors, self._ids, self._owners = vectors, ids, owners
+        self.count, self.dim = count, dim
+
+    def _write_meta(self) -> None:
+        tmp = self._path(META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as handler:
+            json.dump({"count": self.count, "dim": self.dim}, handler)
+        os.replace(tmp, self._path(META_FILE))
+
+    def _allocate(self, capacity: int) -> None:
+        """Cria arquivos com `capacity` linhas, copia as válidas e troca os antigos."""
+        arrays = (
+            (VECTORS_FILE, np.float32, (capacity, self.dim), self._vectors),
+            (IDS_FILE, np.int64, (capacity,), self._ids),
+            (OWNERS_FILE, np.int64, (capacity,), self._owners),
+        )
+        for name, dtype, shape, old in arrays:
+            tmp = self._path(name + ".tmp")
+            new = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+            if old is not None and self.count:
+                new[: self.count] = old[: self.count]
+            new.flush()
+            del new
+        # solta os mapas antigos antes do replace (necessário no Windows)
+        self._vectors = self._ids = self._owners = None
+        for name, _, _, _ in arrays:
+            os.replace(self._path(name + ".tmp"), self._path(name))
+        self._vectors = np.load(self._path(VECTORS_FILE), mmap_mode="r+")
+        self._ids = np.load(self._path(IDS_FILE), mmap_mode="r+")
+        self._owners = np.load(self._path(OWNERS_FILE), mmap_mode="r+")
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def max_id(self) -> int:
+        """Maior id de interação indexado (os ids crescem na ordem de inserção)."""
+        with self._lock:
+            return int(self._ids[self.count - 1]) if self.count else 0
+
+    def reset(self) -> None:
+        """Apaga o índice (ex.: o modelo de embedding mudou de dimensão)."""
+        with self._lock:
+            self._vectors = self._ids = self._owners = None
+            self.count, self.dim = 0, None
+            for name in (VECTORS_FILE, IDS_FILE, OWNERS_FILE, META_FILE):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+
+    def add(self, ids: Sequence[int], vectors, owners: Sequence[int]) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or len(matrix) != len(ids) or len(ids) != len(owners):
+            raise ValueError("ids, vectors and owners must have the same length")
+        if not len(ids):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"vector dim {matrix.shape[1]} != index dim {self.dim}")
+            needed = self.count + len(ids)
+            capacity = 0 if self._vectors is None else len(self._vectors)
+            if needed > capacity:
+                while capacity < needed:
+                    capacity = max(self.initial_capacity, capacity * 2)
+                self._allocate(capacity)
+            end = needed
+            self._vectors[self.count:end] = matrix
+            self._ids[self.count:end] = np.asarray(ids, dtype=np.int64)
+            self._owners[self.count:end] = np.asarray(owners, dtype=np.int64)
+            for array in (self._vectors, self._ids, self._owners):
+                array.flush()
+            self.count = end
+            self._write_meta()
+
+    def search(
+        self, query, k: int = 4, owner: Optional[int] = None, min_score: float = -1.0
+    ) -> List[Tuple[int, float]]:
+        """Top-k por similaridade de cosseno: [(id, score)], do mais parecido para o menos."""
+        with self._lock:
+            if not self.count or k <= 0:
+                return []
+            vector = np.asarray(query, dtype=np.float32)
+            if vector.shape != (self.dim,):
+                return []
+            scores = self._vectors[: self.count] @ vector
+            if owner is not None:
+                scores[self._owners[: self.count] != owner] = -np.inf
+            k = min(k, self.count)
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            return [
+                (int(self._ids[row]), float(scores[row])) for row in top if scores[row] >= min_score
+            ]
+
+
+class HistoryRetriever:
+    """Liga o `MemoryStore` ao `VectorIndex`: indexa interações novas e busca as relevantes.
+
+    `embedder` é um `HashingEmbedder` ou `OllamaEmbedder` (IA/embeddings.py).
+    `sync()` indexa tudo que está no banco e ainda não está no índice, em
+    lotes e na ordem dos ids. Quem salva uma interação só chama
+    `request_sync()`; uma task indexadora espera em `sync_requested()` e
+    roda o `sync`, então o embed nunca fica no caminho da resposta e vários
+    pedidos seguidos viram uma única sincronização.
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        index: VectorIndex,
+        embedder,
+        min_score: float = 0.35,
+        batch_size: int = 64,
+    ):
+        self.store = store
+        self.index = index
+        self.embedder = embedder
+        self.min_score = min_score
+        self.batch_size = max(1, batch_size)
+        self._sync_lock = asyncio.Lock()
+        self._requested = asyncio.Event()
+
+    async def _blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        result = self.embedder.embed(list(texts))
+        if inspect.isawaitable(result):
+            result = await result
+        return np.asarray(result, dtype=np.float32)
+
+    def request_sync(self) -> None:
+        """Pede uma sincronização à task indexadora (não bloqueia; pedidos pendentes se juntam)."""
+        self._requested.set()
+
+    async def sync_requested(self) -> None:
+        """Espera o próximo `request_sync()`."""
+        await self._requested.wait()
+        self._requested.clear()
+
+    async def _sync_batch(self) -> Optional[int]:
+        """Indexa um lote; None quando não há mais nada fora do índice."""
+        async with self._sync_lock:
+            batch = await self._blocking(self.store.entries_after, self.index.max_id, self.batch_size)
+            if not batch:
+                return None
+            vectors = await self.embed([entry_text(entry) for entry in batch])
+            if self.index.dim is not None and vectors.shape[1] != self.index.dim:
+                print(f"[vector_index] embedding dim changed ({self.index.dim} -> {vectors.shape[1]}), rebuilding")
+                await self._blocking(self.index.reset)
+                return 0
+            await self._blocking(
+                self.index.add,
+                [entry["id"] for entry in batch],
+                vectors,
+                [owner_key(entry.get("player")) for entry in batch],
+            )
+            return len(batch)
+
+    async def sync(self) -> int:
+        """Indexa as interações ainda fora do índice; devolve quantas entraram.
+
+        O lock vale por lote, não pela sincronização inteira: o backfill do
+        histórico antigo não segura quem mais precisa do índice.
+        """
+        added = 0
+        while True:
+            count = await self._sync_batch()
+            if count is None:
+                return added
+            added += count
+
+    async def relevant(
+        self, player: Optional[str], query: str, k: int = 4, vector=None
+    ) -> List[Dict[str, object]]:
+        """Até `k` interações do jogador mais parecidas com `query`, da mais relevante para a menos."""
+        if k <= 0 or not len(self.index):
+            return []
+        if vector is None:
+            vector = (await self.embed([query[:MAX_EMBED_CHARS]]))[0]
+        hits = await self._blocking(self.index.search, vector, k, owner_key(player), self.min_score)
+        if not hits:
+            return []
+        entries = await self._blocking(self.store.get_many, [hit_id for hit_id, _ in hits])
+        by_id = {entry["id"]: entry for entry in entries}
+        return [by_id[hit_id] for hit_id, _ in hits if hit_id in by_id]
@@ -2,14 +2,23 @@
 
 from __future__ import annotations
 
+import functools
 import os
 import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Union
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
 
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import NavigableString
+from lxml import etree
+from lxml import html as lxml_html
+
+from IA.http_cache import CachedFetcher, PageCache, make_session
 
 BASE_URL = os.getenv("FACTORIO_WIKI_BASE_URL", "https://wiki.factorio.com")
 USER_AGENT = os.getenv(
@@ -17,6 +26,13 @@ USER_AGENT = os.getenv(
     "MonikaBot/1.0 (+https://github.com/Flokinho3/BOT_FACTORIO)",
 )
 REQUEST_TIMEOUT = float(os.getenv("FACTORIO_WIKI_TIMEOUT", "30"))
+# cache HTTP das páginas (gzip + ETag/Last-Modified); diretório vazio desliga
+PAGE_CACHE_DIR = os.getenv(
+    "FACTORIO_WIKI_CACHE_DIR", os.path.join(os.path.dirname(__file__), "ITEMS", "pages")
+)
+PAGE_CACHE_TTL = float(os.getenv("FACTORIO_WIKI_CACHE_TTL", str(7 * 24 * 3600)))
+# o primeiro uso pode vir de várias threads ao mesmo tempo (prefetch, enricher)
+_SHARED_LOCK = threading.Lock()
 DECIMAL_SEPARATOR = re.compile(r"(?<=\d)\.(?=\d)")
 NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
 
@@ -34,13 +50,45 @@ def _slug_to_title(slug: str) -> str:
     return "_".join(normalized)
 
 
-def build_wiki_url(slug: str) -> str:
-    return f"{BASE_URL}/{_slug_to_title(slug)}"
+def build_wiki_url(slug: str, base_url: Optional[str] = None) -> str:
+    return f"{(base_url or BASE_URL).rstrip('/')}/{_slug_to_title(slug)}"
+
+
+@lru_cache(maxsize=1)
+def _shared_session() -> requests.Session:
+    return make_session(user_agent=USER_AGENT)
+
+
+@lru_cache(maxsize=1)
+def _shared_fetcher() -> Optional[CachedFetcher]:
+    if not PAGE_CACHE_DIR:
+        return None
+    return CachedFetcher(PageCache(PAGE_CACHE_DIR), _shared_session(), ttl=PAGE_CACHE_TTL)
+
+
+def get_session() -> requests.Session:
+    with _SHARED_LOCK:
+        return _shared_session()
+
 
+def get_page_fetcher() -> Optional[CachedFetcher]:
+    with _SHARED_LOCK:
+        return _shared_fetcher()
 
-def fetch_page_html(slug: str) -> str:
-    url = build_wiki_url(slug)
-    response = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT})
+
+def fetch_page_html(
+    slug: str,
+    session: Optional[requests.Session] = None,
+    base_url: Optional[str] = None,
+    max_age: Optional[float] = None,
+) -> str:
+    """HTML da página do item; `max_age` (segundos) força revalidar cópias mais antigas."""
+    url = build_wiki_url(slug, base_url)
+    headers = {"User-Agent": USER_AGENT}
+    fetcher = get_page_fetcher()
+    if fetcher is not None:
+        return fetcher.get(url, timeout=REQUEST_TIMEOUT, headers=headers, max_age=max_age, session=session)
+    response = (session or get_session()).get(url, timeout=REQUEST_TIMEOUT, headers=headers)
     response.raise_for_status()
     return response.text
 
@@ -149,14 +197,17 @@ def _cell_to_value(cell) -> str:
 
 
 def extract_infobox_data(soup: BeautifulSoup) -> Dict[str, str]:
-    info: Dict[str, str] = {}
     reference_table = soup.find("div", class_="infobox-image")
     if not reference_table:
-        return info
+        return {}
     table = reference_table.find_next("table")
     if not table:
-        return info
+        return {}
+    return _extract_table_rows(table)
 
+
+def _extract_table_rows(table) -> Dict[str, str]:
+    info: Dict[str, str] = {}
     rows = table.find_all("tr")
     i = 0
     while i < len(rows):
@@ -230,34 +281,275 @@ def _split_list(value: Optional[str]) -> Optional[List[str]]:
     return tokens or None
 
 
-def parse_infobox_from_html(html: str) -> Dict[str, str]:
-    parser = "lxml"
-    try:
-        soup = BeautifulSoup(html, parser)
-    except Exception:
-        soup = BeautifulSoup(html, "html.parser")
-    return extract_infobox_data(soup)
+class ParsedPage(NamedTuple):
+    infobox: Dict[str, str]
+    display_name: Optional[str]
+    summary: Optional[str]
 
 
-def build_item_payload(slug: str) -> Optional[Dict[str, object]]:
-    html = fetch_page_html(slug)
-    parser = "lxml"
+def _make_soup(html: str) -> BeautifulSoup:
     try:
-        soup = BeautifulSoup(html, parser)
+        return BeautifulSoup(html, "lxml")
     except Exception:
-        soup = BeautifulSoup(html, "html.parser")
+        return BeautifulSoup(html, "html.parser")
+
 
+def parse_page_soup(html: str) -> ParsedPage:
+    """Caminho de referência: árvore BeautifulSoup do documento inteiro."""
+    soup = _make_soup(html)
     infobox = extract_infobox_data(soup)
     if not infobox:
+        return ParsedPage({}, None, None)
+    return ParsedPage(infobox, _extract_display_name(soup), _extract_summary(soup))
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_XPATH_INFOBOX_TABLE = etree.XPath(f"(//div[{_has_class('infobox-image')}])[1]/following::table[1]")
+_XPATH_HEADER_SPAN = etree.XPath(f"(//*[{_has_class('infobox-header-text')}]//span)[1]")
+_XPATH_FIRST_HEADING = etree.XPath("(//h1[@id='firstHeading'])[1]")
+_XPATH_SUMMARY_PARAGRAPHS = etree.XPath(f"(//div[{_has_class('mw-parser-output')}])[1]/p")
+_XPATH_COLOR_BOX = etree.XPath(f".//div[{_has_class('template-color')}]")
+_XPATH_ICONS = etree.XPath(f".//div[{_has_class('factorio-icon')}]")
+_XPATH_ICON_TEXT = etree.XPath(f".//div[{_has_class('factorio-icon-text')}]")
+_XPATH_VALUE_CELL = etree.XPath(f"./td[{_has_class('infobox-vrow-value')}]")
+# strings que o BeautifulSoup não conta em get_text()
+_SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+# Extratores equivalentes aos de cima, sobre elementos lxml: mesmas regras,
+# sem montar objetos BeautifulSoup (o que domina o custo do parse).
+
+
+def _lx_is_element(node) -> bool:
+    return isinstance(node.tag, str)
+
+
+def _lx_strings(element):
+    """Textos do elemento em ordem de documento, como os `NavigableString` do BeautifulSoup."""
+    if element.tag in _SKIPPED_TEXT_TAGS:
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        if _lx_is_element(child):
+            yield from _lx_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _lx_text(element, separator: str = "", strip: bool = False) -> str:
+    strings = _lx_strings(element)
+    if strip:
+        strings = (text.strip() for text in strings)
+        return separator.join(text for text in strings if text)
+    return separator.join(strings)
+
+
+def _lx_classes(element) -> List[str]:
+    return (element.get("class") or "").split()
+
+
+def _lx_extract_color(cell) -> Optional[str]:
+    boxes = _XPATH_COLOR_BOX(cell)
+    if not boxes:
+        return None
+    match = re.search(r"background-color:\s*([^;]+)", boxes[0].get("style", ""))
+    return match.group(1) if match else None
+
+
+def _lx_extract_links(cell) -> Optional[str]:
+    titles = []
+    for link in cell.iter("a"):
+        title = link.get("title") or _lx_text(link, strip=True)
+        if title:
+            titles.append(title)
+    if titles:
+        return ", ".join(dict.fromkeys(titles))
+    return None
+
+
+def _lx_extract_nested_rows(cell) -> Optional[str]:
+    lines: List[str] = []
+    for sub_row in cell.iterdescendants("tr"):
+        entries = [_normalize_text(_lx_text(td, " ", strip=True)) for td in sub_row.iterdescendants("td")]
+        entries = [entry for entry in entries if entry]
+        if entries:
+            lines.append("\t" + "\t".join(entries))
+    return "\n".join(lines) if lines else None
+
+
+def _lx_icon_repr(icon) -> str:
+    qty_nodes = _XPATH_ICON_TEXT(icon)
+    qty_raw = _lx_text(qty_nodes[0], strip=True) if qty_nodes else ""
+    qty_text = _normalize_text(qty_raw) if qty_raw else "1"
+    name = ""
+    link = next(icon.iterdescendants("a"), None)
+    if link is not None:
+        name = link.get("title") or _normalize_text(_lx_text(link, strip=True))
+    if not name:
+        img = next(icon.iterdescendants("img"), None)
+        name = img.get("alt") if img is not None and img.get("alt") else ""
+    if name and qty_text in {"", "1"}:
+        return name
+    if name:
+        return f"{qty_text} {name}".strip()
+    return qty_text
+
+
+def _lx_extract_factorio_icons(cell) -> Optional[str]:
+    if not _XPATH_ICONS(cell):
         return None
 
-    display_name = _extract_display_name(soup) or slug.replace("-", " ").title()
-    summary = _extract_summary(soup)
+    parts: List[str] = []
+
+    def add_string(raw: Optional[str]) -> None:
+        text = _normalize_text(raw) if raw else ""
+        if text:
+            parts.append(text)
+
+    add_string(cell.text)
+    for child in cell:
+        if not _lx_is_element(child):
+            # comentários contam como texto nos filhos diretos (como no BeautifulSoup)
+            add_string(child.text)
+        elif child.tag != "div" or "factorio-icon" not in _lx_classes(child):
+            add_string(_lx_text(child, " ", strip=True))
+        else:
+            icon_repr = _lx_icon_repr(child)
+            if icon_repr:
+                parts.append(icon_repr)
+        add_string(child.tail)
+
+    tokens = [part for part in parts if part]
+    if not tokens:
+        return None
+    has_operator = any(token in {"+", "→", "<-", "->"} for token in tokens)
+    separator = " " if has_operator else ", "
+    return separator.join(tokens) or None
+
+
+def _lx_cell_to_value(cell) -> str:
+    color = _lx_extract_color(cell)
+    if color:
+        return color
+    icons = _lx_extract_factorio_icons(cell)
+    if icons:
+        return icons
+    nested = _lx_extract_nested_rows(cell)
+    if nested:
+        return nested
+    raw_text = _lx_text(cell, "\n", strip=True)
+    lines = [_normalize_text(line) for line in raw_text.splitlines() if line.strip()]
+    if lines:
+        return " ".join(lines)
+    links = _lx_extract_links(cell)
+    if links:
+        return links
+    return ""
+
+
+def _lx_table_rows(table) -> Dict[str, str]:
+    info: Dict[str, str] = {}
+    rows = list(table.iterdescendants("tr"))
+    i = 0
+    while i < len(rows):
+        row = rows[i]
+        cells = [child for child in row if child.tag == "td"]
+        header_cell = next((cell for cell in cells if cell.get("colspan") == "2"), None)
+        if header_cell is not None:
+            key = _lx_text(header_cell, strip=True)
+            value = ""
+            if i + 1 < len(rows):
+                next_row = rows[i + 1]
+                value_cells = _XPATH_VALUE_CELL(next_row) or [child for child in next_row if child.tag == "td"]
+                if value_cells:
+                    value = _lx_cell_to_value(value_cells[0])
+                i += 1
+            if key:
+                info[key] = value
+            i += 1
+            continue
+
+        if len(cells) == 2:
+            key = _lx_text(cells[0], strip=True)
+            value = _lx_cell_to_value(cells[1])
+            if key:
+                info[key] = value
+        i += 1
+
+    return info
+
+
+def parse_page_fast(html: str) -> ParsedPage:
+    """Mesmo resultado de `parse_page_soup`, sem BeautifulSoup.
+
+    O documento é lido pelo lxml (C), os nós da infobox, do título e do
+    resumo são achados por XPath pré-compilado e os extratores `_lx_*`
+    aplicam as mesmas regras dos extratores BeautifulSoup sobre eles.
+    """
+    root = lxml_html.document_fromstring(html)
+    tables = _XPATH_INFOBOX_TABLE(root)
+    if not tables:
+        return ParsedPage({}, None, None)
+    infobox = _lx_table_rows(tables[0])
+    if not infobox:
+        return ParsedPage({}, None, None)
+
+    display_name = None
+    for candidates in (_XPATH_HEADER_SPAN(root), _XPATH_FIRST_HEADING(root)):
+        text = _lx_text(candidates[0], strip=True) if candidates else ""
+        if text:
+            display_name = text
+            break
+
+    summary = None
+    for paragraph in _XPATH_SUMMARY_PARAGRAPHS(root):
+        text = _lx_text(paragraph, " ", strip=True)
+        if text:
+            summary = text
+            break
+    return ParsedPage(infobox, display_name, summary)
+
+
+def parse_page(html: str) -> ParsedPage:
+    try:
+        return parse_page_fast(html)
+    except Exception as exc:
+        # HTML que o caminho rápido não entende: volta para a árvore completa
+        print(f"[wiki_fetcher] fast parser failed, using full soup: {exc!r}")
+        return parse_page_soup(html)
+
+
+def parse_infobox_from_html(html: str) -> Dict[str, str]:
+    return parse_page(html).infobox
+
+
+def build_item_payload(
+    slug: str,
+    session: Optional[requests.Session] = None,
+    base_url: Optional[str] = None,
+    max_age: Optional[float] = None,
+) -> Optional[Dict[str, object]]:
+    html = fetch_page_html(slug, session=session, base_url=base_url, max_age=max_age)
+    return payload_from_page(slug, parse_page(html), base_url)
+
+
+def payload_from_page(
+    slug: str, page: ParsedPage, base_url: Optional[str] = None
+) -> Optional[Dict[str, object]]:
+    infobox = page.infobox
+    if not infobox:
+        return None
+
+    display_name = page.display_name or slug.replace("-", " ").title()
+    summary = page.summary
 
     payload: Dict[str, object] = {
         "slug": slug,
         "name": display_name,
-        "wiki_url": build_wiki_url(slug),
+        "wiki_url": build_wiki_url(slug, base_url),
         "source": "factorio_wiki_auto",
         "retrieved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "raw_fields": infobox,
@@ -310,3 +602,100 @@ def build_item_payload(slug: str) -> Optional[Dict[str, object]]:
         payload["tech_required"] = tech_required
 
     return payload
+
+
+class ItemResult(NamedTuple):
+    """Resultado de um slug em `build_item_payloads`: payload None + error None = página sem infobox."""
+
+    slug: str
+    payload: Optional[Dict[str, object]]
+    error: Optional[BaseException] = None
+
+
+def _parse_item(slug: str, html: str, base_url: Optional[str]) -> Optional[Dict[str, object]]:
+    # nível de módulo para poder ser enviado ao ProcessPoolExecutor
+    return payload_from_page(slug, parse_page(html), base_url)
+
+
+def build_item_payloads(
+    slugs: Iterable[str],
+    fetch: Optional[Callable[[str], Optional[str]]] = None,
+    fetch_workers: int = 8,
+    parse_workers: Optional[int] = None,
+    session: Optional[requests.Session] = None,
+    base_url: Optional[str] = None,
+    max_age: Optional[float] = None,
+) -> Iterator[ItemResult]:
+    """Versão em lote de `build_item_payload`: devolve um `ItemResult` por slug, na ordem em que terminam.
+
+    Os downloads rodam em `fetch_workers` threads (I/O) e o parse, que é CPU,
+    em `parse_workers` processos (padrão: um por núcleo; 0 = parse nas
+    threads). `fetch(slug)` pode substituir o download padrão e devolver None
+    para "página não existe". Só ficam em memória os HTMLs esperando parse
+    (até 4 por processo); os demais slugs aguardam na fila.
+    """
+    if fetch is None:
+        fetch = functools.partial(
+            fetch_page_html, session=session or get_session(), base_url=base_url, max_age=max_age
+        )
+    if parse_workers is None:
+        parse_workers = os.cpu_count() or 1
+    fetch_workers = max(1, fetch_workers)
+    queue = iter(dict.fromkeys(slug for slug in slugs if slug))
+    threads = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="wiki-fetch")
+    processes = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    max_backlog = max(1, parse_workers) * 4
+    fetching: Dict[object, str] = {}
+    parsing: Dict[object, tuple] = {}
+
+    def parse_later(slug: str, html: str) -> None:
+        executor = processes or threads
+        parsing[executor.submit(_parse_item, slug, html, base_url)] = (slug, html)
+
+    def fill() -> None:
+        while len(fetching) < fetch_workers * 2 and len(parsing) < max_backlog:
+            slug = next(queue, None)
+            if slug is None:
+                return
+            fetching[threads.submit(fetch, slug)] = slug
+
+    try:
+        fill()
+        while fetching or parsing:
+            done, _ = wait(list(fetching) + list(parsing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    slug = fetching.pop(future)
+                    try:
+                        html = future.result()
+                    except Exception as exc:
+                        yield ItemResult(slug, None, exc)
+                        continue
+                    if html is None:
+                        yield ItemResult(slug, None)
+                    else:
+                        parse_later(slug, html)
+                    continue
+
+                slug, html = parsing.pop(future)
+                try:
+                    payload = future.result()
+                except BrokenProcessPool:
+                    # processos indisponíveis (ex.: morto pelo sistema): segue parseando nas threads
+                    print("[wiki_fetcher] process pool broken, parsing in threads from now on")
+                    if processes is not None:
+                        processes.shutdown(wait=False)
+                        processes = None
+                    parse_later(slug, html)
+                    continue
+                except Exception as exc:
+                    yield ItemResult(slug, None, exc)
+                    continue
+                yield ItemResult(slug, payload)
+            fill()
+    finally:
+        for future in list(fetching) + list(parsing):
+            future.cancel()
+        threads.shutdown(wait=False)
+        if processes is not None:
+            processes.shutdown(wait=False)
@@ -0,0 +1,273 @@
+"""Pré-carga em lote do catálogo de itens da wiki para a base de itens.
+
+Baixa as páginas em paralelo (pool de threads limitado, uma
+`requests.Session` compartilhada) respeitando um limite de requisições por
+segundo, processa o HTML em vários processos (`build_item_payloads`) e
+grava cada item assim que fica pronto. Rodar de novo continua de
+onde parou: itens já na base são pulados, e as páginas sem infobox/404 ficam
+anotadas em `<db>.prefetch.json` para não serem baixadas outra vez.
+
+Exemplos:
+    python3 -m IA.wiki_prefetch --category Items
+    python3 -m IA.wiki_prefetch steel-chest iron-chest wooden-chest
+    python3 -m IA.wiki_prefetch --file slugs.txt --workers 8 --rate 4
+    python3 -m IA.wiki_prefetch wooden-chest --base-url http://127.0.0.1:8000 --db /tmp/items.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from typing import Iterable, List, NamedTuple, Optional, Set
+from urllib.parse import unquote, urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from IA import wiki_fetcher
+from IA.http_cache import make_session
+from IA.item_store import ItemStore, open_item_store
+
+# status que valem nova tentativa (com espera); os demais 4xx são definitivos
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Espaça o início das requisições em `1 / rate` segundos, entre todas as threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class PrefetchReport(NamedTuple):
+    fetched: int
+    skipped: int
+    missing: int
+    failed: int
+
+
+def title_to_slug(title: str) -> str:
+    return unquote(title).strip().replace("_", " ").lower().replace(" ", "-")
+
+
+def fetch_category_slugs(
+    category: str,
+    session: requests.Session,
+    limiter: Optional[RateLimiter] = None,
+    base_url: Optional[str] = None,
+) -> List[str]:
+    """Slugs das páginas de uma categoria do MediaWiki, seguindo a paginação ("next page")."""
+    if not category.lower().startswith("category:"):
+        category = f"Category:{category}"
+    url: Optional[str] = f"{(base_url or wiki_fetcher.BASE_URL).rstrip('/')}/{category.replace(' ', '_')}"
+    slugs: List[str] = []
+    seen_pages: Set[str] = set()
+    while url and url not in seen_pages:
+        seen_pages.add(url)
+        if limiter:
+            limiter.wait()
+        response = session.get(url, timeout=wiki_fetcher.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, "lxml")
+        pages = soup.find(id="mw-pages")
+        if pages is None:
+            break
+        for link in pages.select("li a"):
+            title = link.get("title") or link.get_text(strip=True)
+            if title:
+                slugs.append(title_to_slug(title))
+        next_link = pages.find("a", string=lambda text: text and "next page" in text.lower())
+        url = urljoin(response.url, next_link["href"]) if next_link and next_link.get("href") else None
+    return list(dict.fromkeys(slugs))
+
+
+def _state_path(store: ItemStore) -> str:
+    return store.path + ".prefetch.json"
+
+
+def _load_missing(path: str) -> Set[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as handler:
+            return set(json.load(handler).get("missing", []))
+    except FileNotFoundError:
+        return set()
+    except Exception as exc:
+        print(f"[wiki_prefetch] ERROR reading {path} (ignored): {exc}")
+        return set()
+
+
+def _save_missing(path: str, missing: Set[str]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as handler:
+        json.dump({"missing": sorted(missing)}, handler, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _fetch_html(
+    slug: str,
+    session: requests.Session,
+    limiter: RateLimiter,
+    base_url: Optional[str],
+    retries: int,
+    max_age: Optional[float] = None,
+) -> Optional[str]:
+    """HTML da página, None se ela não existe; levanta após `retries` falhas."""
+    delay = 1.0
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return wiki_fetcher.fetch_page_html(slug, session=session, base_url=base_url, max_age=max_age)
+        except requests.HTTPError as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            if status not in RETRY_STATUS:
+                if status == 404:
+                    return None
+                raise
+            if attempt == retries:
+                raise
+            retry_after = exc.response.headers.get("Retry-After", "") if exc.response is not None else ""
+            wait = float(retry_after) if retry_after.isdigit() else delay
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            wait = delay
+        time.sleep(wait)
+        delay = min(delay * 2, 60.0)
+    return None
+
+
+def prefetch(
+    slugs: Iterable[str],
+    store: ItemStore,
+    workers: int = 4,
+    rate: float = 2.0,
+    base_url: Optional[str] = None,
+    refresh: bool = False,
+    retries: int = 3,
+    session: Optional[requests.Session] = None,
+    parse_workers: Optional[int] = None,
+) -> PrefetchReport:
+    """Baixa, processa e grava os itens de `slugs` que ainda faltam na base."""
+    workers = max(1, workers)
+    session = session or make_session(workers, wiki_fetcher.USER_AGENT)
+    limiter = RateLimiter(rate)
+    state_path = _state_path(store)
+    missing = set() if refresh else _load_missing(state_path)
+
+    wanted = list(dict.fromkeys(slug for slug in slugs if slug))
+    todo = [slug for slug in wanted if refresh or (slug not in missing and slug not in store)]
+    skipped = len(wanted) - len(todo)
+    fetched = failed = 0
+    print(f"[wiki_prefetch] {len(todo)} to fetch, {skipped} already done ({workers} workers, {rate}/s)")
+
+    # --refresh revalida as páginas em cache (GET condicional) em vez de usar a cópia
+    fetch = functools.partial(
+        _fetch_html,
+        session=session,
+        limiter=limiter,
+        base_url=base_url,
+        retries=retries,
+        max_age=0 if refresh else None,
+    )
+    results = wiki_fetcher.build_item_payloads(
+        todo, fetch=fetch, fetch_workers=workers, parse_workers=parse_workers, base_url=base_url
+    )
+    try:
+        for done, result in enumerate(results, 1):
+            slug = result.slug
+            if result.error is not None:
+                failed += 1
+                print(f"[wiki_prefetch] {done}/{len(todo)} {slug}: ERROR {result.error!r}")
+                continue
+            if result.payload is None:
+                missing.add(slug)
+                print(f"[wiki_prefetch] {done}/{len(todo)} {slug}: no infobox")
+                continue
+            store.put(slug, result.payload)
+            missing.discard(slug)
+            fetched += 1
+            print(f"[wiki_prefetch] {done}/{len(todo)} {slug}: ok")
+    finally:
+        results.close()
+        # também ao interromper (Ctrl+C): a próxima execução retoma daqui
+        _save_missing(state_path, missing)
+    return PrefetchReport(fetched, skipped, len(missing), failed)
+
+
+def _read_slug_file(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as handler:
+        return [line.strip() for line in handler if line.strip() and not line.startswith("#")]
+
+
+def main() -> None:
+    from IA.item_context import ITEM_DATA_PATH, ITEM_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Pré-carrega itens da wiki do Factorio na base de itens")
+    parser.add_argument("slugs", nargs="*", help="Slugs dos itens, ex: steel-chest")
+    parser.add_argument("--file", help="Arquivo com um slug por linha")
+    parser.add_argument("--category", help="Categoria da wiki a percorrer, ex: Items")
+    parser.add_argument("--workers", type=int, default=4, help="Downloads simultâneos")
+    parser.add_argument(
+        "--parse-workers", type=int, default=None, help="Processos de parse (padrão: um por núcleo; 0 = nas threads)"
+    )
+    parser.add_argument("--rate", type=float, default=2.0, help="Máximo de requisições por segundo (0 = sem limite)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--base-url", help="Outra origem para a wiki (ex.: servidor local de fixtures)")
+    parser.add_argument("--db", default=ITEM_DB_PATH, help="Banco de itens")
+    parser.add_argument("--refresh", action="store_true", help="Baixa de novo mesmo os itens já presentes")
+    args = parser.parse_args()
+
+    slugs = list(args.slugs)
+    if args.file:
+        slugs.extend(_read_slug_file(args.file))
+    session = make_session(max(1, args.workers), wiki_fetcher.USER_AGENT)
+    if args.category:
+        found = fetch_category_slugs(args.category, session, RateLimiter(args.rate), args.base_url)
+        print(f"[wiki_prefetch] {len(found)} pages in {args.category}")
+        slugs.extend(found)
+    if not slugs:
+        parser.error("informe slugs, --file ou --category")
+
+    store = open_item_store(args.db, ITEM_DATA_PATH)
+    started = time.perf_counter()
+    try:
+        report = prefetch(
+            slugs,
+            store,
+            workers=args.workers,
+            rate=args.rate,
+            base_url=args.base_url,
+            refresh=args.refresh,
+            retries=args.retries,
+            session=session,
+            parse_workers=args.parse_workers,
+        )
+    finally:
+        store.close()
+    print(
+        f"{report.fetched} baixados, {report.skipped} pulados, {report.missing} sem página,"
+        f" {report.failed} falhas em {time.perf_counter() - started:.1f}s"
+    )
+    fetcher = wiki_fetcher.get_page_fetcher()
+    if fetcher is not None:
+        print(f"cache HTTP: {fetcher.stats}")
+
+
+if __name__ == "__main__":
+    main()
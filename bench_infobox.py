@@ -0,0 +1,61 @@
+"""Mede os dois parsers de infobox da wiki (`IA/wiki_fetcher.py`).
+
+Tempo por página de `parse_page_soup` (árvore BeautifulSoup inteira) e de
+`parse_page_fast` (lxml + XPath). Sem argumentos usa `wooden_chest.html`,
+as fixtures de `tests/fixtures/wiki` e as páginas guardadas no cache HTTP
+(`IA/ITEMS/pages/*.html.gz`). A igualdade dos dois resultados é conferida
+em `tests/test_wiki_parsers.py` (`python3 -m pytest tests`).
+
+Uso:
+    python3 bench_infobox.py --rounds 20
+    python3 bench_infobox.py pagina1.html pagina2.html.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import os
+import time
+
+from IA.wiki_fetcher import PAGE_CACHE_DIR, parse_page_fast, parse_page_soup
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PAGES = [os.path.join(ROOT, "wooden_chest.html")] + sorted(
+    glob.glob(os.path.join(ROOT, "tests", "fixtures", "wiki", "*.html"))
+)
+
+
+def _read(path: str) -> str:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as handler:
+        return handler.read().decode("utf-8", errors="replace")
+
+
+def _time_per_page(parse, pages, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            parse(html)
+    return (time.perf_counter() - started) / (rounds * len(pages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dos parsers de infobox")
+    parser.add_argument("paths", nargs="*", help="Arquivos HTML (ou .html.gz) a medir")
+    parser.add_argument("--rounds", type=int, default=10, help="Repetições de cada página no benchmark")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PAGES + sorted(glob.glob(os.path.join(PAGE_CACHE_DIR, "*.html.gz")))
+    pages = [_read(path) for path in paths]
+    print(f"{len(pages)} páginas, {args.rounds} rodadas")
+
+    slow = _time_per_page(parse_page_soup, pages, args.rounds)
+    fast = _time_per_page(parse_page_fast, pages, args.rounds)
+    print(f"BeautifulSoup (documento inteiro): {slow * 1000:7.2f} ms/página")
+    print(f"lxml + XPath (sem BeautifulSoup):  {fast * 1000:7.2f} ms/página  ({slow / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark de vazão (MB/s) do cliente RCON com respostas grandes do `/monika_pull`.
+
+Sobe um servidor RCON local que responde `/monika_pull` com um payload grande
+dividido em pacotes de 4096 bytes (como servidores Source fazem) e mede a
+vazão de `FactorioRCON` e `AsyncFactorioRCON`.
+
+Uso:
+    python3 bench_rcon.py --size-mb 8 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+import time
+
+from IA.rcon_client import AsyncFactorioRCON, FactorioRCON, _pack_packet
+
+PACKET_BODY = 4096
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = conn.recv(n)
+        if not chunk:
+            raise ConnectionError("cliente desconectou")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def _serve_client(conn: socket.socket, payload: str) -> None:
+    # resposta pré-montada: o custo medido é o do cliente, não o do servidor
+    fragments = [payload[i:i + PACKET_BODY] for i in range(0, len(payload), PACKET_BODY)]
+    with conn:
+        while True:
+            try:
+                size = struct.unpack("<i", _recv_exact(conn, 4))[0]
+                data = _recv_exact(conn, size)
+            except ConnectionError:
+                return
+            request_id, packet_type = struct.unpack("<ii", data[:8])
+            if packet_type == 3:
+                conn.sendall(_pack_packet(request_id, 2, ""))
+            elif packet_type == 0:
+                # eco do sentinela + pacote extra, como servidores Source
+                conn.sendall(_pack_packet(request_id, 0, "") + _pack_packet(request_id, 0, "\x01"))
+            else:
+                conn.sendall(b"".join(_pack_packet(request_id, 0, part) for part in fragments))
+
+
+def start_server(payload: str) -> int:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def accept_loop() -> None:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_serve_client, args=(conn, payload), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def bench_sync(port: int, rounds: int, expected: int) -> float:
+    rcon = FactorioRCON("127.0.0.1", port, "bench")
+    rcon.connect()
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result = rcon.command("/monika_pull")
+            assert len(result) == expected, f"resposta truncada: {len(result)} de {expected}"
+        return time.perf_counter() - start
+    finally:
+        rcon.close()
+
+
+def bench_async(port: int, rounds: int, expected: int) -> float:
+    async def run() -> float:
+        rcon = AsyncFactorioRCON("127.0.0.1", port, "bench")
+        await rcon.connect()
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(rcon.command("/monika_pull") for _ in range(rounds)))
+            elapsed = time.perf_counter() - start
+            for result in results:
+                assert len(result) == expected, f"resposta truncada: {len(result)} de {expected}"
+            return elapsed
+        finally:
+            await rcon.close()
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de vazão do cliente RCON")
+    parser.add_argument("--size-mb", type=float, default=8.0, help="Tamanho da resposta do /monika_pull em MB")
+    parser.add_argument("--rounds", type=int, default=5, help="Quantidade de comandos por cliente")
+    args = parser.parse_args()
+
+    line = "[CHAT] jogador: como faço [item=steel-plate]?\n"
+    payload = (line * (int(args.size_mb * 1024 * 1024) // len(line) + 1))[: int(args.size_mb * 1024 * 1024)]
+    port = start_server(payload)
+    total_mb = len(payload) * args.rounds / (1024 * 1024)
+
+    for name, bench in (("FactorioRCON", bench_sync), ("AsyncFactorioRCON", bench_async)):
+        elapsed = bench(port, args.rounds, len(payload))
+        print(f"{name:<20} {total_mb:8.1f} MB em {elapsed:6.3f}s -> {total_mb / elapsed:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,90 @@
-from IA.rcon_client import FactorioRCON
-from IA.item_context import augment_prompt_with_context
+from IA.rcon_pool import RCONPool
+from IA.chat_ingest import AdaptivePoller, FileTailSource, RconPollSource
+from IA.chat_protocol import ChatMessage, parse_chat_batch, parse_triggers, strip_trigger
+from IA.memory_store import open_memory_store
+from IA.sessions import SessionCache
+from IA.summarizer import HistoryCompactor, OllamaSummarizer
+from IA.streaming import SentenceSplitter
+from IA.embeddings import HashingEmbedder, OllamaEmbedder
+from IA.response_cache import ResponseCache
+from IA.vector_index import HistoryRetriever, VectorIndex
+from IA.llm_dispatcher import LLMDispatcher, build_backends, parse_backends
+from IA.item_context import find_item_slugs, mentions_factorio, missing_item_slugs, safe_build_item_context
+from IA.intent_router import IntentRouter
+from IA.output_writer import LatestImageTracker, OutputWriter
+from IA.context_builder import build_context
 import ollama
+import asyncio
+import functools
 import time
-import json
 import os
-import shutil
-import glob
-from IA.FILES import FACTORY_SCRIPT_OUTPUT_FILE, FACTORY_SCRIPT_OUTPUT_DIR
+from IA.FILES import FACTORY_SCRIPT_OUTPUT_FILE, FACTORY_SCRIPT_OUTPUT_DIR, FACTORY_CHAT_LOG_FILE
 import uuid
+from typing import List, Tuple
 
 # Configuration from environment (safer for deployments)
 # Defaults kept for local development convenience.
 HOST = os.getenv("FACTORIO_RCON_HOST", "localhost")
 PORT = int(os.getenv("FACTORIO_RCON_PORT", "27015"))
 PASSWORD = os.getenv("FACTORIO_RCON_PASSWORD", "senha")
+# Sentinela (pacote vazio após cada comando) para remontar respostas divididas
+RCON_SENTINEL = os.getenv("FACTORIO_RCON_SENTINEL", "1") != "0"
+# Pool de conexões RCON: quantidade de sockets, deadlines e probes de saúde
+RCON_POOL_SIZE = int(os.getenv("FACTORIO_RCON_POOL_SIZE", "2"))
+RCON_COMMAND_TIMEOUT = float(os.getenv("FACTORIO_RCON_TIMEOUT", "10"))
+RCON_CONNECT_TIMEOUT = float(os.getenv("FACTORIO_RCON_CONNECT_TIMEOUT", "5"))
+RCON_PROBE_INTERVAL = float(os.getenv("FACTORIO_RCON_PROBE_INTERVAL", "15"))
+RCON_PROBE_COMMAND = os.getenv("FACTORIO_RCON_PROBE", "/version")
 # Ollama model override (env)
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "Yuno:latest")
+# Backends de geração: "host|modelo|concorrência" separados por vírgula (campos
+# vazios usam OLLAMA_MODEL e MONIKA_BACKEND_CONCURRENCY); vazio = daemon local
+LLM_BACKENDS = os.getenv("MONIKA_BACKENDS", "")
+BACKEND_CONCURRENCY = int(os.getenv("MONIKA_BACKEND_CONCURRENCY", "2"))
+# Modelo pequeno para prompts curtos: nos mesmos hosts (MONIKA_SMALL_MODEL) ou em
+# backends próprios (MONIKA_SMALL_BACKENDS, mesmo formato de MONIKA_BACKENDS)
+SMALL_MODEL = os.getenv("MONIKA_SMALL_MODEL", "")
+SMALL_BACKENDS = os.getenv("MONIKA_SMALL_BACKENDS", "")
+SMALL_PROMPT_CHARS = int(os.getenv("MONIKA_SMALL_PROMPT_CHARS", "60"))
+# Ingestão do chat: "poll" (RCON com intervalo adaptativo) ou "tail" (arquivo via inotify)
+CHAT_INGEST = os.getenv("MONIKA_INGEST", "poll").lower()
+CHAT_LOG_FILE = os.getenv("MONIKA_CHAT_LOG", FACTORY_CHAT_LOG_FILE)
+# Gatilhos (prefixos, separados por vírgula) que fazem uma linha do chat virar pergunta.
+# No modo "tail" o log traz toda a conversa dos jogadores, então o padrão é "monika";
+# no "poll" o mod já escolhe o que enfileira e o filtro é opcional. Vazio = tudo.
+CHAT_TRIGGERS = parse_triggers(os.getenv("MONIKA_TRIGGERS", "monika" if CHAT_INGEST == "tail" else ""))
+# Comando que devolve todas as mensagens enfileiradas pelo mod em um único round trip
+PULL_COMMAND = os.getenv("MONIKA_PULL_COMMAND", "/monika_pull")
+# Poll adaptativo: volta ao mínimo após atividade e dobra até o máximo com o chat quieto
+POLL_MIN_INTERVAL = float(os.getenv("MONIKA_POLL_MIN_INTERVAL", "0.05"))
+POLL_INTERVAL = float(os.getenv("MONIKA_POLL_INTERVAL", "2"))
+# Runtime assíncrono: tamanho das filas e gerações simultâneas
+PROMPT_QUEUE_SIZE = int(os.getenv("MONIKA_PROMPT_QUEUE_SIZE", "32"))
+REPLY_QUEUE_SIZE = int(os.getenv("MONIKA_REPLY_QUEUE_SIZE", "32"))
+GENERATION_WORKERS = int(os.getenv("MONIKA_GENERATION_WORKERS", "4"))
+# Streaming: envia cada frase ao jogo assim que é gerada (0 = resposta inteira no fim)
+STREAM_REPLIES = os.getenv("MONIKA_STREAM", "1") != "0"
+# tamanho máximo de cada mensagem enviada ao jogo no modo streaming
+STREAM_CHUNK_CHARS = int(os.getenv("MONIKA_STREAM_CHUNK_CHARS", "400"))
+# Cache de respostas (exato + similaridade por embeddings) na frente do modelo
+CACHE_ENABLED = os.getenv("MONIKA_CACHE", "1") != "0"
+CACHE_SIZE = int(os.getenv("MONIKA_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("MONIKA_CACHE_TTL", str(24 * 3600)))
+CACHE_THRESHOLD = float(os.getenv("MONIKA_CACHE_THRESHOLD", "0.92"))
+# Embeddings usados pelo cache e pelo índice do histórico: "ollama" (endpoint de embed),
+# "hashing" (local, sem modelo) ou "none" (cache só com match exato, sem índice)
+EMBEDDER = os.getenv("MONIKA_EMBEDDER", os.getenv("MONIKA_CACHE_EMBEDDER", "ollama")).lower()
+EMBED_MODEL = os.getenv("MONIKA_EMBED_MODEL", "nomic-embed-text")
+# Gravação de resposta.json + imagem numa thread de fundo (o RCON não espera disco):
+# respostas a menos de MONIKA_OUTPUT_LINGER segundos uma da outra saem num só lote
+# (todas gravadas, fsyncs no fim; MONIKA_OUTPUT_COALESCE=1 grava só a última);
+# a imagem é copiada (MONIKA_IMAGE_LINK=1 usa hardlink)
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "IA", "IMGS")
+OUTPUT_LINGER = float(os.getenv("MONIKA_OUTPUT_LINGER", "0.05"))
+OUTPUT_COALESCE = os.getenv("MONIKA_OUTPUT_COALESCE", "0") == "1"
+IMAGE_LINK = os.getenv("MONIKA_IMAGE_LINK", "0") == "1"
+# Respostas diretas (template, sem modelo) para consultas simples sobre itens
+FAST_PATH_ENABLED = os.getenv("MONIKA_FAST_PATH", "1") != "0"
 
 
 def now():
@@ -29,11 +98,35 @@ except Exception:
     pass
 
 # ---------------------------------------------------------------------------
-# Memória de conversas (persistida em JSON)
+# Memória de conversas (SQLite em modo WAL, ver IA/memory_store.py)
 # ---------------------------------------------------------------------------
+MEMORY_DB = os.path.join(os.path.dirname(__file__), "IA", "MEMORIAS", "memorias.db")
+# formato antigo; migrado automaticamente para MEMORY_DB na primeira execução
 MEMORY_FILE = os.path.join(os.path.dirname(__file__), "IA", "MEMORIAS", "memorias.json")
-# número máximo de interações a manter no contexto da IA
+# número máximo de interações (por jogador) a manter no contexto da IA
 MAX_MEMORY = 200
+# limite em bytes das sessões de jogadores mantidas em memória (LRU)
+SESSION_CACHE_BYTES = int(os.getenv("MONIKA_SESSION_CACHE_BYTES", str(8 * 1024 * 1024)))
+# orçamento de tokens do prompt (SYSTEM + contexto de itens + histórico + mensagem)
+CONTEXT_TOKENS = int(os.getenv("MONIKA_CONTEXT_TOKENS", "3072"))
+# Compactação do histórico antigo em resumos (job em segundo plano)
+SUMMARY_ENABLED = os.getenv("MONIKA_SUMMARY", "1") != "0"
+# modelo dos resumos; vazio = o modelo de cada backend (os resumos passam pelo dispatcher)
+SUMMARY_MODEL = os.getenv("MONIKA_SUMMARY_MODEL", "") or None
+SUMMARY_KEEP_RECENT = int(os.getenv("MONIKA_SUMMARY_KEEP_RECENT", "20"))
+SUMMARY_BATCH = int(os.getenv("MONIKA_SUMMARY_BATCH", "40"))
+SUMMARY_INTERVAL = float(os.getenv("MONIKA_SUMMARY_INTERVAL", "300"))
+# resumos por rodada (o histórico antigo inteiro é resumido aos poucos)
+SUMMARY_MAX_PER_RUN = int(os.getenv("MONIKA_SUMMARY_MAX_PER_RUN", "8"))
+# quantos resumos (os mais recentes) entram no contexto
+SUMMARY_DIGESTS = int(os.getenv("MONIKA_SUMMARY_DIGESTS", "5"))
+# Índice vetorial do histórico (IA/vector_index.py): turnos antigos escolhidos por relevância
+RETRIEVAL_ENABLED = os.getenv("MONIKA_RETRIEVAL", "1") != "0"
+RETRIEVAL_K = int(os.getenv("MONIKA_RETRIEVAL_K", "4"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("MONIKA_RETRIEVAL_MIN_SCORE", "0.35"))
+INDEX_DIR = os.getenv(
+    "MONIKA_INDEX_DIR", os.path.join(os.path.dirname(__file__), "IA", "MEMORIAS", "index")
+)
 
 # Mensagem SYSTEM explícita para garantir contexto em cada chamada
 SYSTEM_PROMPT = (
@@ -44,35 +137,9 @@ SYSTEM_PROMPT = (
     " Se o pedido for fora do contexto do jogo, responda educadamente que não pode ajudar com isso e direcione para assuntos de automação/fábrica."
 )
 
-def load_memory():
-    """Carrega a lista de interações armazenadas em `memorias.json`.
-    Se o arquivo não existir ou estiver corrompido, retorna lista vazia.
-    """
-    if not os.path.exists(MEMORY_FILE):
-        return []
-    try:
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Espera que o JSON seja um dict com chave 'interactions' ou uma lista direta
-            if isinstance(data, dict) and "interactions" in data:
-                return data["interactions"]
-            if isinstance(data, list):
-                return data
-    except Exception as e:
-        print(f"[{now()}] ERROR loading memory file: {e}")
-    return []
-
-
 def is_factorio_text(s: str) -> bool:
-    if not s:
-        return False
-    s = s.lower()
-    keywords = [
-        "minério", "ferro", "cobre", "bicho", "bichos", "assembler", "foguete",
-        "rocket", "trem", "train", "ciência", "science", "engenheiro", "fábrica",
-        "factory", "poluição", "mod", "caldeira", "braço", "inserter", "belts",
-    ]
-    return any(k in s for k in keywords)
+    # palavras-chave do jogo e nomes/apelidos de itens, numa única passada (IA/entity_matcher.py)
+    return mentions_factorio(s)
 
 
 def sanitize_history(history: list, max_items: int) -> list:
@@ -90,6 +157,10 @@ def sanitize_history(history: list, max_items: int) -> list:
     for entry in history:
         p = (entry.get("prompt") or "")
         r = (entry.get("response") or "")
+        # o nome do jogador ("steel: ...") não é menção a item
+        player = entry.get("player")
+        if player and p.startswith(f"{player}: "):
+            p = p[len(player) + 2:]
         if is_factorio_text(p) or is_factorio_text(r):
             related.append(entry)
 
@@ -100,204 +171,405 @@ def sanitize_history(history: list, max_items: int) -> list:
     # garante limite
     return related[-max_items:]
 
-def save_memory(interactions):
-    """Persiste a lista de interações em `memorias.json` de forma atômica."""
-    tmp = MEMORY_FILE + ".tmp"
+def safe_for_command(s: str) -> str:
+    # Remove quebras de linha e aspas problemáticas para envio via RCON
+    return s.replace('\n', ' ').replace('\r', ' ').replace('"', "'")
+
+
+def addressed(message: ChatMessage, text: str) -> str:
+    """Texto prefixado com o jogador respondido ("@thiago: ...").
+
+    Com várias gerações em paralelo, as frases de respostas diferentes se
+    intercalam no chat do jogo; o prefixo diz a quem cada linha responde.
+    """
+    return f"@{message.player}: {text}" if message.player else text
+
+
+def reply_splitter(message: ChatMessage) -> SentenceSplitter:
+    # o prefixo do jogador conta no tamanho de cada mensagem
+    return SentenceSplitter(max_chars=STREAM_CHUNK_CHARS - len(addressed(message, "")))
+
+
+def split_reply(message: ChatMessage, text: str) -> List[str]:
+    """Resposta pronta (cache, caminho rápido) nas mesmas partes do streaming, sem cortar o fim."""
+    splitter = reply_splitter(message)
+    chunks = splitter.feed(text)
+    rest = splitter.flush()
+    return chunks + [rest] if rest else chunks
+
+
+def build_messages(sessions: SessionCache, message: ChatMessage, related: list = None) -> list:
+    """Monta a lista de mensagens (SYSTEM + contexto + histórico do jogador + prompt atual).
+
+    Tudo cabe em `CONTEXT_TOKENS`: o SYSTEM entra sempre, depois o contexto de
+    itens, os turnos relacionados vindos do índice vetorial e então os turnos
+    mais recentes, até o orçamento acabar. Sem índice (`related` None), a
+    relevância cai no filtro por palavras-chave de `sanitize_history`.
+    """
+    prompt = message.prompt
+    # Só o histórico de quem perguntou (sessão quente em memória ou lida do disco)
+    recent = sessions.history(message.player, MAX_MEMORY)
+    # turnos antigos já resumidos entram como digest, não crus
+    digests = sessions.store.digests(message.player, SUMMARY_DIGESTS)
+    if digests:
+        covered = digests[-1]["last_id"]
+        recent = [entry for entry in recent if entry["id"] > covered]
+    if related is None:
+        recent = sanitize_history(recent, MAX_MEMORY)
+    # contexto automático dos itens citados (se houver); só no texto, não no nome do jogador
+    item_ctx = safe_build_item_context(message.text)
+
+    result = build_context(
+        SYSTEM_PROMPT,
+        prompt,
+        recent,
+        item_ctx,
+        budget=CONTEXT_TOKENS,
+        digests=[digest["summary"] for digest in digests],
+        related=related or (),
+    )
+    print(f"[{now()}] CONTEXT: {result.summary()}")
+    return result.messages
+
+
+def persist_interaction(sessions: SessionCache, message: ChatMessage, resp: str) -> bool:
     try:
-        os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump({"interactions": interactions}, f, ensure_ascii=False, indent=2)
-            f.flush()
-            os.fsync(f.fileno())
-        os.replace(tmp, MEMORY_FILE)
+        # append O(1): um INSERT, sem reler nem reescrever o histórico
+        sessions.append(message.player, message.prompt, resp, timestamp=now())
+        print(
+            f"[{now()}] MEMORY saved (total {len(sessions.store)} entries,"
+            f" {len(sessions)} active sessions, {sessions.size_bytes} bytes)"
+        )
+        return True
     except Exception as e:
-        print(f"[{now()}] ERROR saving memory file: {e}")
+        print(f"[{now()}] ERROR persisting memory: {e}")
+        return False
 
 
-def safe_for_command(s: str) -> str:
-    # Remove quebras de linha e aspas problemáticas para envio via RCON
-    return s.replace('\n', ' ').replace('\r', ' ').replace('"', "'")
+async def run_blocking(func, *args):
+    """Executa `func` (I/O de disco, parser, HTTP) no thread pool padrão do loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args))
+
 
+def build_chat_source(pool: RCONPool):
+    """Escolhe a fonte de mensagens conforme `MONIKA_INGEST` ("poll" ou "tail")."""
+    poller = AdaptivePoller(POLL_MIN_INTERVAL, POLL_INTERVAL)
+    if CHAT_INGEST == "tail":
+        print(f"[{now()}] Tailing chat log: {CHAT_LOG_FILE}")
+        return FileTailSource(CHAT_LOG_FILE, poller)
+    return RconPollSource(pool, PULL_COMMAND, poller)
 
-def extract_message_from_rcon(raw: str) -> str:
-    """Tenta extrair 'player: message' do output bruto do RCON.
 
-    Estratégia:
-    - divide em linhas e procura a última linha que contém ': '
-    - tenta remover prefixos como timestamps ou tags '[CHAT]'
-    - se não encontrar, retorna o raw sem mudanças (strip)
+async def poll_chat(source, prompts: asyncio.Queue) -> None:
+    """Task de leitura: consome a fonte de chat e enfileira cada mensagem do lote."""
+    tailing = isinstance(source, FileTailSource)
+    async for raw_prompt in source.messages():
+        batch = parse_chat_batch(raw_prompt)
+        if tailing or any(message.player for message in batch):
+            # descarta linhas que não são chat (join, save, etc.)
+            batch = [message for message in batch if message.player]
+        if not batch:
+            continue
+        if CHAT_TRIGGERS:
+            # conversa comum entre jogadores não ocupa geração
+            batch = [message for message in (strip_trigger(entry, CHAT_TRIGGERS) for entry in batch) if message]
+            if not batch:
+                continue
+        print(f"[{now()}] RAW_RECEIVED: {raw_prompt}")
+        for message in batch:
+            print(f"[{now()}] EXTRACTED: {message.prompt} (tick={message.tick})")
+            # fila cheia => aplica backpressure na leitura em vez de acumular sem limite
+            await prompts.put(message)
+
+
+async def stream_reply(
+    dispatcher: LLMDispatcher, pool: RCONPool, message: ChatMessage, messages: list
+) -> Tuple[str, bool]:
+    """Gera em streaming e envia cada frase completa ao jogo assim que ela chega.
+
+    Devolve (texto, completo): com erro no meio do stream o texto é o que foi
+    gerado até ali (já enviado ao jogo) e `completo` é False.
+    """
+    splitter = reply_splitter(message)
+    parts = []
+    sent = 0
+    complete = True
+
+    async def push(chunk: str) -> None:
+        nonlocal sent
+        try:
+            await pool.send_monika_message(safe_for_command(addressed(message, chunk)))
+            sent += 1
+        except Exception as e:
+            print(f"[{now()}] ERROR sending streamed chunk via RCON: {e!r}")
+
+    try:
+        async for token in dispatcher.stream(messages, hint=message.text):
+            parts.append(token)
+            for sentence in splitter.feed(token):
+                await push(sentence)
+    except Exception as e:
+        print(f"[{now()}] ERROR during ollama.chat stream: {e}")
+        if not parts:
+            raise
+        complete = False
+    rest = splitter.flush()
+    if rest:
+        await push(rest)
+    print(f"[{now()}] SENT to game via RCON ({sent} streamed chunks)")
+    return "".join(parts), complete
+
+
+def build_dispatcher() -> LLMDispatcher:
+    specs = parse_backends(LLM_BACKENDS, OLLAMA_MODEL, BACKEND_CONCURRENCY) or [
+        (None, OLLAMA_MODEL, BACKEND_CONCURRENCY)
+    ]
+    small_specs = parse_backends(SMALL_BACKENDS, SMALL_MODEL or OLLAMA_MODEL, BACKEND_CONCURRENCY)
+    if not small_specs and SMALL_MODEL:
+        small_specs = [(host, SMALL_MODEL, concurrency) for host, _, concurrency in specs]
+    dispatcher = LLMDispatcher(
+        build_backends(specs, ollama.AsyncClient),
+        build_backends(small_specs, ollama.AsyncClient),
+        small_prompt_chars=SMALL_PROMPT_CHARS,
+    )
+    names = ", ".join(backend.name for backend in dispatcher.backends + dispatcher.small_backends)
+    print(f"[{now()}] LLM backends: {names}")
+    return dispatcher
+
+
+def build_embedder(client):
+    if EMBEDDER == "ollama":
+        return OllamaEmbedder(client, EMBED_MODEL)
+    if EMBEDDER == "hashing":
+        return HashingEmbedder()
+    return None
+
+
+async def find_related(retriever: HistoryRetriever, message: ChatMessage, vector=None) -> list:
+    """Turnos antigos do jogador mais parecidos com a pergunta (None = sem índice disponível).
+
+    `vector` é o embedding da pergunta já calculado pelo cache (mesmo embedder);
+    sem ele a pergunta é embedada aqui.
     """
-    if not raw:
-        return ""
-
-    lines = [l.strip() for l in raw.splitlines() if l.strip()]
-    if not lines:
-        return raw.strip()
-
-    # Procura da última para frente por uma linha com ': '
-    for ln in reversed(lines):
-        # exemplo: '2025-11-28 12:56:05 [CHAT] thiago: ola'
-        # remover prefixos entre colchetes
-        cleaned = ln
-        # se tiver [CHAT] ou similar
-        if '] ' in cleaned and '[' in cleaned:
-            # pega parte após o último '] '
-            parts = cleaned.split('] ')
-            cleaned = parts[-1]
-
-        # agora busca pattern 'name: message'
-        if ': ' in cleaned:
-            return cleaned  # já no formato 'player: message'
-
-    # fallback: retorna última linha
-    return lines[-1]
-
-
-def main_loop():
-    # Tentativa contínua de conexão com backoff exponencial
-    backoff = 1
-    max_backoff = 60
+    if retriever is None:
+        return None
+    try:
+        started = time.perf_counter()
+        related = await retriever.relevant(message.player, message.text, RETRIEVAL_K, vector=vector)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"[{now()}] RETRIEVED {len(related)} related turns ({elapsed:.1f} ms, {len(retriever.index)} indexed)")
+        return related
+    except Exception as e:
+        print(f"[{now()}] ERROR querying history index: {e!r}")
+        return None
+
+
+async def index_history(retriever: HistoryRetriever) -> None:
+    """Task do indexador: indexa o histórico na partida e de novo a cada `request_sync()`."""
     while True:
-        rcon = FactorioRCON(HOST, PORT, PASSWORD)
         try:
-            rcon.connect()
-            print(f"[{now()}] Connected to RCON {HOST}:{PORT}")
-            # reset backoff após conexão bem-sucedida
-            backoff = 1
+            added = await retriever.sync()
+            if added > 1:
+                print(f"[{now()}] INDEXED {added} interactions ({len(retriever.index)} total)")
         except Exception as e:
-            print(f"[{now()}] ERROR connecting RCON: {e}; retrying in {backoff}s")
-            time.sleep(backoff)
-            backoff = min(max_backoff, backoff * 2)
-            continue
+            print(f"[{now()}] ERROR indexing history: {e!r}")
+        await retriever.sync_requested()
+
+
+async def generate_replies(
+    dispatcher: LLMDispatcher,
+    pool: RCONPool,
+    sessions: SessionCache,
+    cache: ResponseCache,
+    retriever: HistoryRetriever,
+    router: IntentRouter,
+    prompts: asyncio.Queue,
+    replies: asyncio.Queue,
+) -> None:
+    """Task de geração: várias instâncias rodam em paralelo, uma por prompt em andamento."""
+    while True:
+        message: ChatMessage = await prompts.get()
+        try:
+            # consulta simples (pilha, vida, receita...) responde direto da base de itens
+            fast = await run_blocking(router.route, message.text) if router else None
+            if fast is not None:
+                print(f"[{now()}] FAST PATH ({', '.join(fast.intents)}): {fast.text}")
+                print(f"[{now()}] ROUTER: {router.stats()}")
+                await replies.put((message, fast.text, False))
+                continue
+
+            cached, probe = None, None
+            if cache:
+                try:
+                    # tags e itens citados pelo nome: "placa de aço" e "placa de cobre" não dividem resposta
+                    slugs = await run_blocking(find_item_slugs, message.text)
+                    cached, probe = await cache.lookup(message.text, slugs)
+                except Exception as e:
+                    # sem os itens citados a chave não é confiável: gera sem cache
+                    print(f"[{now()}] ERROR checking response cache: {e!r}")
+            if cached is not None:
+                print(f"[{now()}] CACHE HIT: {cache.stats()}")
+                await replies.put((message, cached, False))
+                continue
+
+            resp = None
+            complete = False
+            # reaproveita o embedding da consulta ao cache: a pergunta é embedada uma vez só
+            vector = probe.vector if probe is not None else None
+            try:
+                if probe is not None and probe.slugs:
+                    # item ainda sendo buscado na wiki: a resposta sai sem o contexto dele
+                    # e não deve ficar no cache
+                    if await run_blocking(missing_item_slugs, list(probe.slugs)):
+                        probe = None
+                related = await find_related(retriever, message, vector)
+                messages = await run_blocking(build_messages, sessions, message, related)
+
+                # Log curto do system (não imprime todo o conteúdo para evitar flood)
+                print(f"[{now()}] SENDING_SYSTEM: {SYSTEM_PROMPT[:200]}...")
+
+                if STREAM_REPLIES:
+                    resp, complete = await stream_reply(dispatcher, pool, message, messages)
+                else:
+                    resp = await dispatcher.complete(messages, hint=message.text)
+                    complete = True
+            except Exception as e:
+                print(f"[{now()}] ERROR calling ollama.chat: {e}")
+
+            if resp is not None:
+                print(f"[{now()}] GENERATED: {resp}")
+                print(f"[{now()}] LLM: {dispatcher.stats()}")
+                if router:
+                    print(f"[{now()}] ROUTER: {router.stats()}")
+                if cache and complete:
+                    # resposta cortada por erro no stream não vai para o cache
+                    cache.store(probe, resp)
+                await replies.put((message, resp, STREAM_REPLIES))
+        finally:
+            prompts.task_done()
+
 
-        # Loop principal: somente executa enquanto a conexão existir
+async def send_replies(
+    pool: RCONPool,
+    sessions: SessionCache,
+    retriever: HistoryRetriever,
+    writer: OutputWriter,
+    replies: asyncio.Queue,
+) -> None:
+    """Task de envio: agenda `resposta.json`, responde via RCON, persiste a memória e pede a indexação."""
+    while True:
+        message, resp, streamed = await replies.get()
+        prompt = message.prompt
         try:
-            while True:
+            data = {
+                "timestamp": now(),
+                "id": str(uuid.uuid4()),
+                "prompt": prompt,
+                "response": resp
+            }
+            # arquivo + imagem mais recente gravados pela thread do writer, sem esperar aqui
+            writer.submit(data)
+
+            # Também enviar via RCON para compatibilidade (compacta a resposta);
+            # no modo streaming as frases já foram enviadas durante a geração e as
+            # respostas prontas (cache, caminho rápido) saem nas mesmas partes, inteiras
+            if not streamed:
                 try:
-                    prompt = rcon.command('/monika_pull')
+                    if STREAM_REPLIES:
+                        chunks = split_reply(message, resp)
+                        for chunk in chunks:
+                            await pool.send_monika_message(safe_for_command(addressed(message, chunk)))
+                        print(f"[{now()}] SENT to game via RCON ({len(chunks)} chunks)")
+                    else:
+                        short = safe_for_command(addressed(message, resp))[:1000]
+                        await pool.send_monika_message(short)
+                        print(f"[{now()}] SENT to game via RCON (short)")
                 except Exception as e:
-                    print(f"[{now()}] ERROR RCON command (will reconnect): {e}")
-                    break  # sai do loop interno e tenta reconectar
-
-                if prompt and prompt.strip() != "":
-                    raw_prompt = prompt
-                    prompt = extract_message_from_rcon(raw_prompt).strip()
-                    print(f"[{now()}] RAW_RECEIVED: {raw_prompt}")
-                    print(f"[{now()}] EXTRACTED: {prompt}")
-
-                    resp = None
-                    try:
-                        # Carrega histórico de conversas, sanitiza e monta mensagens para o modelo
-                        history = load_memory()
-                        recent = history[-MAX_MEMORY:] if MAX_MEMORY > 0 else []
-                        sanitized = sanitize_history(recent, MAX_MEMORY)
-
-                        # Mensagens: primeiro a SYSTEM para garantir o contexto de Monika
-                        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-                        for entry in sanitized:
-                            if entry.get("prompt"):
-                                messages.append({"role": "user", "content": entry["prompt"]})
-                            if entry.get("response"):
-                                messages.append({"role": "assistant", "content": entry["response"]})
-                        # adiciona a mensagem atual (com contexto automático, se houver)
-                        augmented_prompt = augment_prompt_with_context(prompt)
-                        messages.append({"role": "user", "content": augmented_prompt})
-
-                        # Log curto do system (não imprime todo o conteúdo para evitar flood)
-                        try:
-                            print(f"[{now()}] SENDING_SYSTEM: {SYSTEM_PROMPT[:200]}...")
-                        except Exception:
-                            pass
-
-                        resp = ollama.chat(
-                            model=OLLAMA_MODEL,
-                            messages=messages
-                        )["message"]["content"]
-                    except Exception as e:
-                        print(f"[{now()}] ERROR calling ollama.chat: {e}")
-
-                    if resp is not None:
-                        print(f"[{now()}] GENERATED: {resp}")
-
-                        data = {
-                            "timestamp": now(),
-                            "id": str(uuid.uuid4()),
-                            "prompt": prompt,
-                            "response": resp
-                        }
-                        # --- Anexar imagem (se existir) ---
-                        # Busca a imagem mais recente em IA/IMGS/ e a copia (atomicamente)
-                        try:
-                            imgs_dir = os.path.join(os.path.dirname(__file__), "IA", "IMGS")
-                            image_dest_name = None
-                            if os.path.isdir(imgs_dir):
-                                # procura arquivos de imagem comuns
-                                patterns = ["*.png", "*.jpg", "*.jpeg", "*.webp", "*.gif"]
-                                candidates = []
-                                for p in patterns:
-                                    candidates.extend(glob.glob(os.path.join(imgs_dir, p)))
-
-                                if candidates:
-                                    # escolhe o mais recentemente modificado
-                                    candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-                                    src_image = candidates[0]
-                                    _, ext = os.path.splitext(src_image)
-                                    image_dest_name = f"{data['id']}{ext}"
-                                    dest_path = os.path.join(FACTORY_SCRIPT_OUTPUT_DIR, image_dest_name)
-                                    tmp_path = dest_path + ".tmp"
-                                    # copia bytes para arquivo tmp e substitui
-                                    with open(src_image, "rb") as rf, open(tmp_path, "wb") as wf:
-                                        shutil.copyfileobj(rf, wf)
-                                        wf.flush()
-                                        os.fsync(wf.fileno())
-                                    os.replace(tmp_path, dest_path)
-                                    print(f"[{now()}] COPIED image to: {dest_path} (atomic)")
-                            # adiciona referência da imagem no JSON (ou None)
-                            data["image"] = image_dest_name
-                        except Exception as e:
-                            print(f"[{now()}] ERROR handling image: {e}")
-
-                        # Escreve de forma atômica: escreve em tmp e faz replace
-                        tmp_file = FACTORY_SCRIPT_OUTPUT_FILE + ".tmp"
-                        try:
-                            with open(tmp_file, "w", encoding="utf-8") as f:
-                                json.dump(data, f, ensure_ascii=False)
-                                f.flush()
-                                os.fsync(f.fileno())
-                            os.replace(tmp_file, FACTORY_SCRIPT_OUTPUT_FILE)
-                            print(f"[{now()}] WROTE: {FACTORY_SCRIPT_OUTPUT_FILE} (atomic)")
-                        except Exception as e:
-                            print(f"[{now()}] ERROR writing resposta file: {e}")
-
-                        # Também enviar via RCON para compatibilidade (compacta a resposta)
-                        try:
-                            short = safe_for_command(resp)[:1000]
-                            rcon.send_monika_message(short)
-                            print(f"[{now()}] SENT to game via RCON (short)")
-                        except Exception as e:
-                            print(f"[{now()}] ERROR sending reply via RCON: {e}")
-
-                        # ---------- Persistir na memória ----------
-                        try:
-                            # Carrega memória atual, adiciona nova interação e salva
-                            mem = load_memory()
-                            mem.append({"timestamp": now(), "prompt": prompt, "response": resp})
-                            save_memory(mem)
-                            print(f"[{now()}] MEMORY saved (total {len(mem)} entries)")
-                        except Exception as e:
-                            print(f"[{now()}] ERROR persisting memory: {e}")
-
-                time.sleep(1)
+                    print(f"[{now()}] ERROR sending reply via RCON: {e!r}")
+
+            # ---------- Persistir na memória ----------
+            saved = await run_blocking(persist_interaction, sessions, message, resp)
+            if saved and retriever is not None:
+                # o embed roda na task do indexador, fora do caminho das respostas
+                retriever.request_sync()
         finally:
-            try:
-                rcon.close()
-            except Exception:
-                pass
-            # se cair aqui, tenta reconectar com backoff
-            print(f"[{now()}] Disconnected; reconnecting in {backoff}s")
-            time.sleep(backoff)
-            backoff = min(max_backoff, backoff * 2)
+            replies.task_done()
+
+
+async def run() -> None:
+    pool = RCONPool(
+        HOST,
+        PORT,
+        PASSWORD,
+        size=RCON_POOL_SIZE,
+        command_timeout=RCON_COMMAND_TIMEOUT,
+        connect_timeout=RCON_CONNECT_TIMEOUT,
+        probe_interval=RCON_PROBE_INTERVAL,
+        probe_command=RCON_PROBE_COMMAND,
+        use_sentinel=RCON_SENTINEL,
+    )
+    await pool.start()
+    memory = await run_blocking(open_memory_store, MEMORY_DB, MEMORY_FILE)
+    sessions = SessionCache(memory, max_turns=MAX_MEMORY, max_bytes=SESSION_CACHE_BYTES)
+    client = ollama.AsyncClient()
+    dispatcher = build_dispatcher()
+    prompts: asyncio.Queue = asyncio.Queue(maxsize=PROMPT_QUEUE_SIZE)
+    replies: asyncio.Queue = asyncio.Queue(maxsize=REPLY_QUEUE_SIZE)
+    embedder = build_embedder(client)
+    cache = None
+    if CACHE_ENABLED:
+        cache = ResponseCache(embedder, max_entries=CACHE_SIZE, ttl=CACHE_TTL, threshold=CACHE_THRESHOLD)
+    router = IntentRouter() if FAST_PATH_ENABLED else None
+    writer = OutputWriter(
+        FACTORY_SCRIPT_OUTPUT_FILE,
+        FACTORY_SCRIPT_OUTPUT_DIR,
+        LatestImageTracker(IMAGES_DIR),
+        link_images=IMAGE_LINK,
+        linger=OUTPUT_LINGER,
+        coalesce=OUTPUT_COALESCE,
+    )
+    retriever = None
+    if RETRIEVAL_ENABLED and embedder is not None:
+        index = await run_blocking(VectorIndex, INDEX_DIR)
+        retriever = HistoryRetriever(memory, index, embedder, min_score=RETRIEVAL_MIN_SCORE)
+
+    tasks = [asyncio.create_task(poll_chat(build_chat_source(pool), prompts))]
+    tasks.extend(
+        asyncio.create_task(generate_replies(dispatcher, pool, sessions, cache, retriever, router, prompts, replies))
+        for _ in range(max(1, GENERATION_WORKERS))
+    )
+    tasks.append(asyncio.create_task(send_replies(pool, sessions, retriever, writer, replies)))
+    if retriever is not None:
+        # indexa em segundo plano o histórico antigo e, depois, cada interação salva
+        tasks.append(asyncio.create_task(index_history(retriever)))
+    if SUMMARY_ENABLED:
+        compactor = HistoryCompactor(
+            memory,
+            OllamaSummarizer(dispatcher, SUMMARY_MODEL),
+            keep_recent=SUMMARY_KEEP_RECENT,
+            batch_size=SUMMARY_BATCH,
+            interval=SUMMARY_INTERVAL,
+            max_per_run=SUMMARY_MAX_PER_RUN,
+        )
+        tasks.append(asyncio.create_task(compactor.run()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await pool.close()
+        await run_blocking(writer.close)
+        memory.close()
+
+
+def main():
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == '__main__':
-    main_loop()
+    main()
@@ -0,0 +1,69 @@
+"""Tabela de frases -> intenções do `IntentRouter.classify` (PT-BR e EN)."""
+
+from __future__ import annotations
+
+import pytest
+
+from IA.intent_router import IntentRouter
+
+# (pergunta, intenções esperadas, inglês?)
+CASES = [
+    # receita
+    ("como faço [item=steel-plate]?", ["recipe"], False),
+    ("Como faço uma [item=steel-plate]", ["recipe"], False),
+    ("como eu faço [item=iron-gear-wheel]?", ["recipe"], False),
+    ("como se faz [item=electronic-circuit]", ["recipe"], False),
+    ("como fazer [item=steel-chest]?", ["recipe"], False),
+    ("como faça [item=pipe]", ["recipe"], False),
+    ("como fabrico [item=inserter]?", ["recipe"], False),
+    ("qual a receita do [item=steel-chest]?", ["recipe"], False),
+    ("ingredientes do [item=battery]", ["recipe"], False),
+    ("how do I make [item=steel-plate]?", ["recipe"], True),
+    ("how to craft [item=steel-chest]", ["recipe"], True),
+    ("recipe for [item=electronic-circuit]", ["recipe"], True),
+    # a frase da receita já traz o tempo
+    ("receita e tempo de fabricação do [item=steel-chest]", ["recipe"], False),
+    # tempo
+    ("quanto tempo demora o [item=steel-chest]?", ["recipe_time"], False),
+    ("how long to craft [item=steel-chest]?", ["recipe_time"], True),
+    # pilha, slots, vida, tecnologia
+    ("qual a pilha do [item=steel-chest]?", ["stack_size"], False),
+    ("what is the stack size of [item=steel-chest]?", ["stack_size"], True),
+    ("quantos slots tem o [item=steel-chest]?", ["inventory_size"], False),
+    ("qual a vida do [item=stone-wall]?", ["health"], False),
+    ("how much health does [item=stone-wall] have?", ["health"], True),
+    ("qual pesquisa desbloqueia o [item=steel-chest]?", ["tech"], False),
+    ("which research unlocks [item=steel-chest]?", ["tech"], True),
+    # custo bruto e máquinas (máquinas só com taxa)
+    ("qual o custo bruto do [item=electronic-circuit]?", ["raw_cost"], False),
+    ("quanta matéria-prima vai num [item=electronic-circuit]?", ["raw_cost"], False),
+    ("total raw for [item=electronic-circuit]", ["raw_cost"], True),
+    ("quantas montadoras pra 2 [item=electronic-circuit] por segundo?", ["machines"], False),
+    ("how many assemblers for 60 [item=iron-gear-wheel] per minute?", ["machines"], True),
+    ("quantas montadoras pro [item=electronic-circuit]?", [], False),
+    # várias intenções na mesma pergunta
+    ("pilha e vida do [item=steel-chest]", ["stack_size", "health"], False),
+    # perguntas abertas e sem intenção vão para o modelo
+    ("por que o [item=steel-chest] é melhor?", [], False),
+    ("qual a melhor receita de [item=electronic-circuit]?", [], False),
+    ("como facilitar a produção de [item=steel-plate]?", [], False),
+    ("oi Monika, tudo bem?", [], False),
+]
+
+
+@pytest.mark.parametrize("text,intents,english", CASES)
+def test_classify(text, intents, english):
+    found, is_english = IntentRouter(lookup=lambda slug: None, graph=lambda: None).classify(text)
+    assert found == intents
+    if intents:
+        assert is_english == english
+
+
+def test_recipe_without_time_goes_to_model():
+    # receita estruturada sem tempo e sem texto da wiki: nada de inventar 0,5s
+    payload = {"recipe": {"ingredients": {"Steel plate": 8}}}
+    router = IntentRouter(lookup=lambda slug: payload, graph=lambda: None)
+    assert router.route("quanto tempo demora o [item=steel-chest]?") is None
+    assert router.route("qual a receita do [item=steel-chest]?") is None
+    payload["recipe"]["time"] = 0.5
+    assert "0.5s" in router.route("quanto tempo demora o [item=steel-chest]?").text
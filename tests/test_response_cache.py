@@ -0,0 +1,49 @@
+"""O cache de respostas só serve perguntas que se entendem sem o histórico de quem perguntou."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from IA.embeddings import HashingEmbedder
+from IA.response_cache import ResponseCache, is_self_contained, normalize_question
+
+
+def ask(cache, text, slugs, answer):
+    """Um turno: consulta o cache e, na falta, grava `answer` como a resposta do modelo."""
+    cached, probe = asyncio.run(cache.lookup(text, slugs))
+    if cached is None:
+        cache.store(probe, answer)
+    return cached
+
+
+def test_follow_up_from_one_player_is_not_served_to_another():
+    cache = ResponseCache(embedder=HashingEmbedder())
+    # alice falava do baú de aço, bob do cinturão; "isso" é outra coisa para cada um
+    assert ask(cache, "qual a pilha do [item=steel-chest]?", ["steel-chest"], "50") is None
+    assert ask(cache, "e quanto custa isso?", [], "8 placas de aço") is None
+    assert ask(cache, "e quanto custa isso?", [], "1 engrenagem e 1 placa de ferro") is None
+    # com item citado a continuação ainda depende da conversa anterior
+    assert ask(cache, "e a pilha do [item=iron-chest]?", ["iron-chest"], "50") is None
+    assert ask(cache, "e a pilha do [item=iron-chest]?", ["iron-chest"], "32") is None
+    assert cache.stats()["skipped"] == 4
+    # a pergunta completa continua compartilhada entre jogadores
+    assert ask(cache, "qual a pilha do [item=steel-chest]?", ["steel-chest"], "?") == "50"
+
+
+@pytest.mark.parametrize(
+    "text, slugs, expected",
+    [
+        ("qual a pilha do [item=steel-chest]?", ["steel-chest"], True),
+        ("how do I make [item=steel-plate]?", ["steel-plate"], True),
+        ("quanto custa isso?", [], False),
+        ("qual a pilha dele?", [], False),
+        ("e o [item=iron-chest]?", ["iron-chest"], False),
+        ("quanto tempo demora esse [item=steel-chest]?", ["steel-chest"], False),
+        ("what about that [item=pipe]?", ["pipe"], False),
+        ("bom dia monika", [], False),
+    ],
+)
+def test_is_self_contained(text, slugs, expected):
+    assert is_self_contained(normalize_question(text), slugs) is expected
@@ -0,0 +1,83 @@
+"""Diferencial entre os dois parsers de infobox (`IA/wiki_fetcher.py`).
+
+`parse_page_fast` (lxml + XPath) tem que devolver exatamente o mesmo que
+`parse_page_soup` (BeautifulSoup, a referência) em cada fixture. As
+fixtures de `tests/fixtures/wiki` cobrem os ramos que a página real
+(`wooden_chest.html`, que na verdade é a do Steel chest) não exercita; os
+testes de `COVERAGE` garantem que elas continuam cobrindo esses ramos.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from IA.wiki_fetcher import parse_page_fast, parse_page_soup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, "tests", "fixtures", "wiki")
+FIXTURES = {
+    "steel_chest": os.path.join(ROOT, "wooden_chest.html"),
+    **{
+        name[: -len(".html")]: os.path.join(FIXTURES_DIR, name)
+        for name in sorted(os.listdir(FIXTURES_DIR))
+        if name.endswith(".html")
+    },
+}
+
+# (fixture, campo da infobox ou atributo da página, valor esperado): um por ramo dos extratores
+COVERAGE = [
+    # _extract_color
+    ("links_and_color", "Map color", "#d2c400"),
+    ("links_and_color", "Color without value", "no swatch"),
+    # _extract_links: só links com title, sem texto; títulos repetidos uma vez só
+    ("links_and_color", "Required technologies", "Automation (research), Logistics (research)"),
+    ("links_and_color", "Links without title", ""),
+    # script/style não contam como texto
+    ("links_and_color", "Energy consumption", "94,2 kW (fuel)"),
+    # _extract_nested_rows: linhas vazias somem, decimais normalizados
+    ("nested_rows_first_heading", "Resistances", "\tPhysical\t3/20%\n\tFire\t0/100%\n\tAcid 2,5\t0/80% (normal)"),
+    ("nested_rows_first_heading", "Storage size", "\t48\t1,5k"),
+    # cabeçalho colspan=2 sem célula infobox-vrow-value na linha seguinte / sem linha seguinte
+    ("nested_rows_first_heading", "Health", "350"),
+    ("nested_rows_first_heading", "Trailing header", ""),
+    # _extract_factorio_icons: comentários diretos contam como texto, os aninhados não
+    (
+        "icons_with_comments",
+        "Recipe",
+        "icon list generated by Template:Icon 0,5 Time + sep Iron plate + 3 Copper cable → Electronic circuit",
+    ),
+    # ícone sem link (alt da imagem), link sem title, sem nome, quantidade vazia
+    ("icons_with_comments", "Alternatives", "or via, 2 Foundry, Electromagnetic plant, 7, 1"),
+    ("icons_with_comments", "Consumed by", "1,2k Inserter, Lab, Radar"),
+    # título: span do cabeçalho da infobox ou, vazio, o firstHeading
+    ("links_and_color", "display_name", "Burner inserter"),
+    ("nested_rows_first_heading", "display_name", "Stone wall"),
+    # resumo: primeiro <p> direto e não vazio do conteúdo
+    ("links_and_color", "summary", "The burner inserter is the most basic inserter , burning 94.2\xa0kW of fuel."),
+    ("no_infobox", "display_name", None),
+    ("empty_infobox", "summary", None),
+]
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8") as handler:
+        return handler.read()
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_fast_parser_matches_soup(name):
+    html = _read(FIXTURES[name])
+    reference, fast = parse_page_soup(html), parse_page_fast(html)
+    assert fast.infobox == reference.infobox
+    assert list(fast.infobox) == list(reference.infobox)
+    assert fast.display_name == reference.display_name
+    assert fast.summary == reference.summary
+
+
+@pytest.mark.parametrize("name,field,expected", COVERAGE)
+def test_fixtures_cover_branch(name, field, expected):
+    page = parse_page_soup(_read(FIXTURES[name]))
+    value = getattr(page, field) if field in page._fields else page.infobox.get(field)
+    assert value == expected